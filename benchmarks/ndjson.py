@@ -0,0 +1,76 @@
+"""Micro-benchmark of serializing Gancio events to Newline Delimited JSON.
+
+Compares `json.dump` of `gancio.to_dict(event)` per event, used before,
+with the `NdjsonWriter` caching fragments shared by occurrences of one
+event.
+
+Run it like that:
+
+    python -m benchmarks.ndjson --events 100 --occurrences 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import io
+import json
+import os
+import timeit
+from typing import TYPE_CHECKING
+
+from benchmarks import workloads
+from event_scrapper_srt import gancio
+from event_scrapper_srt import ndjson
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+    from event_scrapper_srt.event import GancioEvent
+
+
+def to_dict_path(events: list[GancioEvent], stream: TextIO) -> None:
+    for event in events:
+        json.dump(gancio.to_dict(event), stream, indent=None, ensure_ascii=False, default=str)
+        stream.write('\n')
+
+
+def writer_path(events: list[GancioEvent], stream: TextIO) -> None:
+    writer = ndjson.NdjsonWriter(stream)
+    for event in events:
+        writer.write(event)
+    writer.flush()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='benchmarks.ndjson')
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--occurrences', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    # Past occurrences are skipped when creating Gancio events
+    now = datetime.datetime.now(datetime.timezone.utc)
+    first = (now + datetime.timedelta(days=1)).date()
+    events = workloads.events(args.events, args.occurrences, first)
+    gancio_events = gancio.create_events(events)
+    expected, actual = io.StringIO(), io.StringIO()
+    to_dict_path(gancio_events, expected)
+    writer_path(gancio_events, actual)
+    assert expected.getvalue() == actual.getvalue()
+
+    with open(os.devnull, 'w', encoding='utf-8') as f:
+        old = min(
+            timeit.repeat(lambda: to_dict_path(gancio_events, f), number=1, repeat=args.repeat)
+        )
+        new = min(
+            timeit.repeat(lambda: writer_path(gancio_events, f), number=1, repeat=args.repeat)
+        )
+    print(f'{len(gancio_events)} events')
+    print(f'to_dict + json.dump: {old * 1000:.2f} ms')
+    print(f'NdjsonWriter:        {new * 1000:.2f} ms ({old / new:.1f}x faster)')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+"""Micro-benchmark of parsing the `Kiedy?` section of recurring events.
+
+Compares the generic per-paragraph parser with the pre-compiled regex
+fast path on a section built from `testing/example-event-recurring.html`
+with the given number of weekly occurrences.
+
+Run it like that:
+
+    python -m benchmarks.occurrences --occurrences 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import timeit
+from zoneinfo import ZoneInfo
+
+from bs4 import BeautifulSoup
+
+from benchmarks import workloads
+from event_scrapper_srt import scrapper
+
+
+def recurring_section(occurrences: int) -> list[BeautifulSoup]:
+    """Return `<p>` elements of the `Kiedy?` section with weekly occurrences."""
+    html = workloads.recurring_page(occurrences, datetime.date(2024, 7, 7))
+    soup = BeautifulSoup(html, 'html.parser')
+    for elem in soup.find_all('h5'):
+        if scrapper._Header.DATE_TIMES in elem.text:  # noqa: SLF001
+            return elem.parent.find_all('p')
+    raise AssertionError
+
+
+def generic_path(paragraphs: list[BeautifulSoup]) -> list[scrapper.Occurrence]:
+    return [
+        scrapper._extract_date_time(p, tzinfo=ZoneInfo('Europe/Warsaw'))  # noqa: SLF001
+        for p in paragraphs
+        if p.find('strong')
+    ]
+
+
+def fast_path(paragraphs: list[BeautifulSoup]) -> list[scrapper.Occurrence]:
+    return scrapper._extract_date_times(paragraphs)  # noqa: SLF001
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='benchmarks.occurrences')
+    parser.add_argument('--occurrences', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    paragraphs = recurring_section(args.occurrences)
+    assert generic_path(paragraphs) == fast_path(paragraphs)
+
+    generic = min(timeit.repeat(lambda: generic_path(paragraphs), number=1, repeat=args.repeat))
+    fast = min(timeit.repeat(lambda: fast_path(paragraphs), number=1, repeat=args.repeat))
+    print(f'{args.occurrences} occurrences')
+    print(f'generic path: {generic * 1000:.2f} ms')
+    print(f'fast path:    {fast * 1000:.2f} ms ({generic / fast:.1f}x faster)')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+"""Benchmark of the CLI startup time, measured with `python -X importtime`.
+
+Runs `python -m event_scrapper_srt --help` in fresh interpreters and
+reports the median cumulative import time of `event_scrapper_srt.main`,
+with the slowest modules imported at startup.
+
+Run it like that:
+
+    python -m benchmarks.startup --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules which must not be imported only to show help or parse arguments
+HEAVY_MODULES = (
+    'bs4',
+    'lxml',
+    'lxml.etree',
+    'lxml.html',
+    'zoneinfo',
+    'http.client',
+    'urllib.request',
+    'sqlite3',
+    'concurrent.futures',
+)
+
+
+def import_times(argv: list[str]) -> dict[str, int]:
+    """Return cumulative import times in microseconds of modules imported by the CLI."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'event_scrapper_srt', *argv],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[1],
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.removeprefix('import time:').split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='benchmarks.startup')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    runs = [import_times(['--help']) for _ in range(args.repeat)]
+    total = statistics.median(run['event_scrapper_srt.main'] for run in runs)
+    print(f'event_scrapper_srt.main: {total / 1000:.1f} ms (median of {args.repeat} runs)')
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    for name, cumulative in slowest[: args.top]:
+        print(f'  {cumulative / 1000:7.1f} ms  {name}')
+    heavy = [name for name in HEAVY_MODULES if name in runs[-1]]
+    if heavy:
+        print(f'heavy modules imported at startup: {", ".join(heavy)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
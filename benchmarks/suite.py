@@ -0,0 +1,202 @@
+"""Benchmark suite of the scrapping pipeline.
+
+Each stage is timed separately on synthetic workloads built from the test
+fixtures, and its peak memory allocation is measured with `tracemalloc`.
+Everything runs offline: pages and sitemaps are served through the
+`content_getter` injection points.
+
+Run it like that:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json
+
+With `--compare`, stages slower than the saved results by more than
+`--threshold` are reported as regressions, and the exit code is 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import TYPE_CHECKING
+from typing import Any
+
+from benchmarks import workloads
+from event_scrapper_srt import gancio
+from event_scrapper_srt import main as cli
+from event_scrapper_srt import scrapper
+from event_scrapper_srt import sitemap
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def measure(name: str, func: Callable[[], object], repeat: int) -> dict[str, Any]:
+    """Time the function and measure its peak memory allocation."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    fastest, median = min(timings), statistics.median(timings)
+    print(
+        f'{name:<45} min {fastest * 1000:10.2f} ms   '
+        f'median {median * 1000:10.2f} ms   peak {peak / 2**20:8.2f} MB',
+        file=sys.stderr,
+    )
+    return {'name': name, 'min_s': fastest, 'median_s': median, 'peak_bytes': peak}
+
+
+def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    first = (now + datetime.timedelta(days=1)).date()
+    results = []
+
+    for entries in args.sitemap_entries:
+        content = workloads.sitemap_xml(entries, now)
+        results.append(
+            measure(
+                f'sitemap.get_elements[{entries} entries]',
+                functools.partial(sitemap.get_elements, content),
+                args.repeat,
+            )
+        )
+
+    page = workloads.recurring_page(args.occurrences, first).encode()
+    for engine, extract in scrapper.ENGINES.items():
+        results.append(
+            measure(
+                f'scrapper.extract[{engine}, {args.occurrences} occurrences]',
+                functools.partial(extract, page, 'https://example.com/'),
+                args.repeat,
+            )
+        )
+
+    pages = workloads.event_pages(args.pages, args.event_occurrences, first)
+    for engine in scrapper.ENGINES:
+        results.append(
+            measure(
+                f'scrapper.get_events[{engine}, {args.pages} pages]',
+                functools.partial(
+                    scrapper.get_events,
+                    list(pages),
+                    content_getter=pages.__getitem__,
+                    engine=engine,
+                ),
+                args.repeat,
+            )
+        )
+
+    events = workloads.events(args.events, args.event_occurrences, first)
+    results.append(
+        measure(
+            f'gancio.create_events[{args.events} events]',
+            functools.partial(gancio.create_events, events),
+            args.repeat,
+        )
+    )
+
+    gancio_events = gancio.create_events(events)
+
+    def dump() -> None:
+        with open(os.devnull, 'w', encoding='utf-8') as f, contextlib.redirect_stdout(f):
+            cli.dump_events_to_json(gancio_events)
+
+    results.append(
+        measure(f'main.dump_events_to_json[{len(gancio_events)} events]', dump, args.repeat)
+    )
+    return results
+
+
+def compare(results: list[dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Print the comparison with the saved results. Return whether there's a regression."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+    regression = False
+    for result in results:
+        if (old := baseline.get(result['name'])) is None:
+            continue
+        ratio = result['min_s'] / old['min_s']
+        status = 'REGRESSION' if ratio > 1 + threshold else 'ok'
+        regression |= status == 'REGRESSION'
+        print(f'{result["name"]:<45} {ratio:6.2f}x   {status}', file=sys.stderr)
+    return regression
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='benchmarks.suite')
+    parser.add_argument(
+        '--sitemap-entries',
+        type=int,
+        nargs='+',
+        default=[10_000, 100_000],
+        help='sizes of the sitemaps, e.g. 10000 1000000 (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--occurrences',
+        type=int,
+        default=200,
+        help='occurrences of the single recurring event page (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--event-occurrences',
+        type=int,
+        default=20,
+        help='occurrences of each event in multi-event stages (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--pages', type=int, default=50, help='scrapped pages (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--events', type=int, default=2000, help='events for Gancio (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='runs of each stage (default: %(default)s)'
+    )
+    parser.add_argument('--output', help='save results to this JSON file')
+    parser.add_argument('--compare', help='compare results with this JSON file')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.2,
+        help='relative slowdown reported as regression (default: %(default)s)',
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    'args': vars(args),
+                    'results': results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare and compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
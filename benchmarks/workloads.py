@@ -0,0 +1,87 @@
+"""Synthetic workloads built from the test fixtures."""
+
+from __future__ import annotations
+
+import datetime
+import html
+
+from event_scrapper_srt import scrapper
+from event_scrapper_srt.event import Event
+from testing import fakes
+from testing import resources
+
+_MONTHS = {num: name for name, num in scrapper._MONTHS_PL.items()}  # noqa: SLF001
+
+_URLSET_START = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<urlset xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    b'xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9 '
+    b'http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd" '
+    b'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+
+
+def sitemap_xml(entries: int, now: datetime.datetime) -> bytes:
+    """Return events sitemap with the given number of entries.
+
+    Like on the real site, entries are sorted from the oldest to the
+    newest, and most of them are older than the default `max_age_days`.
+    One entry is added per hour, so the newest 720 are within 30 days.
+    """
+    parts = [_URLSET_START]
+    for i in range(entries):
+        lastmod = now - datetime.timedelta(hours=entries - i)
+        parts.append(
+            f'\t<url>\n'
+            f'\t\t<loc>https://swingrevolution.pl/wydarzenia/event-{i}/</loc>\n'
+            f'\t\t<lastmod>{lastmod.isoformat(timespec="seconds")}</lastmod>\n'
+            f'\t</url>\n'.encode()
+        )
+    parts.append(b'</urlset>\n')
+    return b''.join(parts)
+
+
+def recurring_page(occurrences: int, first: datetime.date) -> str:
+    """Return recurring event page with the given number of weekly occurrences."""
+    page = fakes.content_getter('testing/example-event-recurring.html').decode()
+    paragraphs = []
+    for week in range(occurrences):
+        day = first + datetime.timedelta(weeks=week)
+        paragraphs.append(
+            f'<p><strong>{day.day} {_MONTHS[day.month]} {day.year}</strong> 20:00 - 23:00\n'
+            '                                            <hr/>\n</p>'
+        )
+    start = page.index('<p><strong>')
+    end = page.index('</div>', start)
+    return page[:start] + '\n'.join(paragraphs) + page[end:]
+
+
+def event_pages(count: int, occurrences: int, first: datetime.date) -> dict[str, bytes]:
+    """Return URL to content mapping of event pages, to be used as `content_getter`."""
+    page = recurring_page(occurrences, first)
+    return {
+        f'https://swingrevolution.pl/wydarzenia/event-{i}/': page.replace(
+            'Sunday Summer Night', html.escape(f'Sunday Summer Night {i}')
+        ).encode()
+        for i in range(count)
+    }
+
+
+def events(count: int, occurrences: int, first: datetime.date) -> list[Event]:
+    """Return scrapped events with the given number of weekly occurrences each."""
+    template = scrapper._extract_event_details(  # noqa: SLF001
+        recurring_page(occurrences, first).encode(), resources.example_event_recurring.url
+    )
+    assert template is not None
+    return [
+        Event(
+            url=f'https://swingrevolution.pl/wydarzenia/event-{i}/',
+            title=f'{template.title} {i}',
+            description=template.description,
+            place_name=template.place_name,
+            place_address=template.place_address,
+            image_url=template.image_url,
+            date_times=template.date_times,
+        )
+        for i in range(count)
+    ]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import os
+    from collections.abc import Callable
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """A fetch of the URL recorded in the archive index.
+
+    Args:
+    ----
+        sha256: The hash of the fetched body, naming its archived object.
+        fetched_at: The time when the body was fetched.
+
+    """
+
+    sha256: str
+    fetched_at: datetime
+
+
+class PageArchive:
+    """Content-addressed archive of fetched sitemaps and pages.
+
+    Bodies are stored gzipped in `objects/`, named after their SHA-256
+    hash, so a page which didn't change between crawls is stored once.
+    Every fetch is appended to `index.ndjson` with the URL, the hash, and
+    the fetch time. When replaying, the latest fetch of each URL is used.
+
+    Args:
+    ----
+        directory: The directory of the archive, created if it doesn't exist.
+
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = Path(directory)
+        (self.directory / 'objects').mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / 'index.ndjson'
+        self._entries: dict[str, ArchiveEntry] = {}
+        self._lock = threading.Lock()
+        try:
+            with self.index_path.open(encoding='utf-8') as index:
+                for line in index:
+                    if line.strip():
+                        raw = json.loads(line)
+                        self._entries[raw['url']] = ArchiveEntry(
+                            sha256=raw['sha256'],
+                            fetched_at=datetime.fromisoformat(raw['fetched_at']),
+                        )
+        except FileNotFoundError:
+            logging.info(f'Archive index `{self.index_path}` not found, starting from scratch')
+
+    def recording(self, content_getter: Callable[[str], bytes]) -> Callable[[str], bytes]:
+        """Return content getter which archives everything fetched with `content_getter`."""
+
+        def get_content(url: str) -> bytes:
+            content = content_getter(url)
+            self.put(url, content)
+            return content
+
+        return get_content
+
+    def put(self, url: str, content: bytes, fetched_at: datetime | None = None) -> str:
+        """Archive the fetched content of the URL. Return hash of the content."""
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._object_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+            # Archive is read back much more often than it's written
+            tmp_path.write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+            tmp_path.replace(path)
+        entry = ArchiveEntry(sha256=sha256, fetched_at=fetched_at or datetime.now(timezone.utc))
+        line = json.dumps(
+            {'url': url, 'sha256': sha256, 'fetched_at': entry.fetched_at.isoformat()}
+        )
+        with self._lock, self.index_path.open('a', encoding='utf-8') as index:
+            index.write(line + '\n')
+            self._entries[url] = entry
+        return sha256
+
+    def get_content(self, url: str) -> bytes:
+        """Return the latest archived content of the URL.
+
+        Raises `FileNotFoundError` if the URL was never archived, so the
+        page is skipped like any other page which failed to download.
+        """
+        entry = self._entries.get(url)
+        if entry is None:
+            msg = f'`{url}` not found in the archive'
+            raise FileNotFoundError(msg)
+        return gzip.decompress(self._object_path(entry.sha256).read_bytes())
+
+    def fetched_at(self, url: str) -> datetime | None:
+        """Return the time of the latest archived fetch of the URL."""
+        entry = self._entries.get(url)
+        return entry.fetched_at if entry else None
+
+    def _object_path(self, sha256: str) -> Path:
+        # Objects are spread over subdirectories, as some file systems
+        # slow down with many files in a single directory
+        return self.directory / 'objects' / sha256[:2] / f'{sha256}.gz'
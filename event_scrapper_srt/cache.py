@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """Page body stored on disk with its HTTP validators.
+
+    Args:
+    ----
+        body: The decompressed body of the page.
+        etag: The value of the `ETag` header, if sent by the server.
+        last_modified: The value of the `Last-Modified` header, if sent
+                       by the server.
+
+    """
+
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Return headers asking the server to answer 304 if page didn't change."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """On-disk cache of fetched pages, revalidated with conditional requests.
+
+    Each URL is stored as two files named after the hash of the URL:
+    `.body` with the page content, and `.json` with the validators. When
+    the total size of bodies exceeds `max_size`, the least recently used
+    entries are removed. Sizes of the bodies are read from disk once and
+    then tracked in memory, so storing a page doesn't scan the directory.
+
+    Args:
+    ----
+        directory: The directory where the cache is stored.
+        max_size: The maximum total size of cached bodies in bytes.
+
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], max_size: int = 100 * 2**20) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Sizes of the bodies, from the least to the most recently used
+        self._sizes: dict[Path, int] = {}
+        entries = []
+        for path in self.directory.glob('*.body'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._sizes[path] = size
+        self._total = sum(self._sizes.values())
+
+    def get(self, url: str) -> CachedPage | None:
+        """Return the cached page for the URL, or `None` if it's not cached."""
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            # Access time is tracked with mtime, as atime is often disabled
+            try:
+                os.utime(body_path)
+            except FileNotFoundError:
+                # Evicted in the meantime, the body is still valid though
+                pass
+            else:
+                self._used(body_path, len(body))
+        return CachedPage(body=body, etag=meta['etag'], last_modified=meta['last_modified'])
+
+    def put(self, url: str, page: CachedPage) -> None:
+        """Store the page in the cache, evicting old entries if needed."""
+        if not page.etag and not page.last_modified:
+            # Without validators the page could never be revalidated
+            return
+        body_path, meta_path = self._paths(url)
+        with self._lock:
+            # Files are replaced atomically, and the validators are removed
+            # until the new body is in place, so a run killed in the middle
+            # never leaves a truncated body which could be revalidated
+            meta_path.unlink(missing_ok=True)
+            tmp_path = body_path.with_name(f'{body_path.name}.tmp')
+            tmp_path.write_bytes(page.body)
+            tmp_path.replace(body_path)
+            meta = {'url': url, 'etag': page.etag, 'last_modified': page.last_modified}
+            tmp_path = meta_path.with_name(f'{meta_path.name}.tmp')
+            tmp_path.write_text(json.dumps(meta))
+            tmp_path.replace(meta_path)
+            self._used(body_path, len(page.body))
+            if self._total > self.max_size:
+                self._evict()
+
+    def record(self, *, hit: bool) -> None:
+        """Count a cache hit or miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        name = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f'{name}.body', self.directory / f'{name}.json'
+
+    def _used(self, body_path: Path, size: int) -> None:
+        self._total += size - self._sizes.pop(body_path, 0)
+        self._sizes[body_path] = size
+
+    def _evict(self) -> None:
+        while self._sizes and self._total > self.max_size:
+            path = next(iter(self._sizes))
+            self._total -= self._sizes.pop(path)
+            logging.debug(f'Evicting `{path.name}` from HTTP cache')
+            path.unlink(missing_ok=True)
+            path.with_suffix('.json').unlink(missing_ok=True)
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import http.client
+import sys
+import threading
+import urllib.error
+import urllib.parse
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from event_scrapper_srt.cache import CachedPage
+from event_scrapper_srt.metrics import METRICS
+
+if TYPE_CHECKING:
+    from email.message import Message
+
+    from event_scrapper_srt.cache import HttpCache
+
+_REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+_MAX_REDIRECTS = 5
+# Methods which can be sent again without a risk of repeating their effect
+_RESENDABLE_METHODS = frozenset({'GET', 'HEAD'})
+# Size of the reads from the socket, so the compressed body is never
+# held in memory as a whole
+_CHUNK_SIZE = 2**16
+
+
+class PageTooLargeError(OSError):
+    """Response body exceeds the maximum size allowed by the client."""
+
+
+class ContentDecodingError(OSError):
+    """Response body is corrupt or truncated according to its `Content-Encoding`."""
+
+
+@dataclass(frozen=True)
+class Response:
+    """A complete, already decompressed, HTTP response.
+
+    Args:
+    ----
+        url: The final URL of the response, after following redirects.
+        status: The HTTP status code.
+        headers: The response headers.
+        body: The decompressed response body.
+
+    """
+
+    url: str
+    status: int
+    headers: Message
+    body: bytes
+
+
+class HttpClient:
+    """HTTP client keeping a pool of keep-alive connections per host.
+
+    Responses compressed with gzip or deflate are decompressed
+    transparently, chunk by chunk as the body is read. The client is
+    thread-safe, so a single instance can be shared by all the concurrent
+    page downloads.
+
+    Args:
+    ----
+        connect_timeout: Timeout in seconds for establishing a connection.
+        read_timeout: Timeout in seconds for each read from an established
+                      connection.
+        max_idle_per_host: The maximum number of idle connections kept
+                           open for a single host.
+        cache: Optional on-disk cache used by `get_content`. Cached pages
+               are revalidated with conditional requests, and served from
+               disk when the server answers 304.
+        max_body_size: The maximum size in bytes of the decompressed
+                       response body. Larger responses are abandoned as
+                       soon as the limit is exceeded while streaming, and
+                       `PageTooLargeError` is raised. No limit if `None`.
+
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 30.0,
+        max_idle_per_host: int = 4,
+        cache: HttpCache | None = None,
+        max_body_size: int | None = None,
+    ) -> None:
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.cache = cache
+        self.max_body_size = max_body_size
+        self._idle: defaultdict[tuple[str, str], list[http.client.HTTPConnection]] = defaultdict(
+            list
+        )
+        self._lock = threading.Lock()
+
+    def get_content(self, url: str) -> bytes:
+        """Return the body of the provided URL. Can be used as `content_getter`."""
+        if self.cache is None:
+            return self.request('GET', url).body
+
+        cached = self.cache.get(url)
+        headers = cached.conditional_headers() if cached else {}
+        response = self.request('GET', url, headers=headers)
+        if response.status == 304 and cached:
+            self.cache.record(hit=True)
+            return cached.body
+        self.cache.record(hit=False)
+        self.cache.put(
+            url,
+            CachedPage(
+                body=response.body,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+            ),
+        )
+        return response.body
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        """Send a request, following redirects.
+
+        Raises `urllib.error.HTTPError` if the final response has an
+        error status, just like `urllib.request.urlopen` does.
+        """
+        request_headers = {
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': f'Python-urllib/{sys.version_info.major}.{sys.version_info.minor}',
+        }
+        request_headers.update(headers or {})
+        for _ in range(_MAX_REDIRECTS + 1):
+            status, reason, response_headers, response_body = self._send(
+                method, url, body, request_headers
+            )
+            location = response_headers.get('Location')
+            if status not in _REDIRECT_STATUSES or not location:
+                break
+            url = urllib.parse.urljoin(url, location)
+            if status == 303 or (status in {301, 302} and method == 'POST'):
+                method, body = 'GET', None
+                request_headers.pop('Content-Type', None)
+        else:
+            raise urllib.error.HTTPError(url, status, 'Too many redirects', response_headers, None)
+
+        METRICS.inc('http_responses_total', status=str(status))
+        if status >= 400:
+            raise urllib.error.HTTPError(url, status, reason, response_headers, None)
+        return Response(url=url, status=status, headers=response_headers, body=response_body)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            for connections in self._idle.values():
+                for conn in connections:
+                    conn.close()
+            self._idle.clear()
+
+    def _send(
+        self, method: str, url: str, body: bytes | None, headers: dict[str, str]
+    ) -> tuple[int, str, Message, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+
+        conn, reused = self._acquire(key)
+        try:
+            response, data = _exchange(conn, method, path, body, headers, self.max_body_size)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            if not reused or method not in _RESENDABLE_METHODS:
+                raise
+            # The server closed the idle connection in the meantime, so
+            # retry once on a fresh one. Other methods aren't resent, as the
+            # server could have already handled the request.
+            conn, _ = self._acquire(key, fresh=True)
+            response, data = _exchange(conn, method, path, body, headers, self.max_body_size)
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(key, conn)
+        return response.status, response.reason, response.headers, data
+
+    def _acquire(
+        self, key: tuple[str, str], *, fresh: bool = False
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        if not fresh:
+            with self._lock:
+                if self._idle[key]:
+                    return self._idle[key].pop(), True
+
+        scheme, netloc = key
+        conn: http.client.HTTPConnection
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(netloc, timeout=self.connect_timeout)
+        elif scheme == 'http':
+            conn = http.client.HTTPConnection(netloc, timeout=self.connect_timeout)
+        else:
+            msg = f'Unsupported URL scheme: `{scheme}`'
+            raise ValueError(msg)
+        conn.connect()
+        assert conn.sock is not None
+        conn.sock.settimeout(self.read_timeout)
+        return conn, False
+
+    def _release(self, key: tuple[str, str], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle[key]) < self.max_idle_per_host:
+                self._idle[key].append(conn)
+                return
+        conn.close()
+
+
+def _exchange(
+    conn: http.client.HTTPConnection,
+    method: str,
+    path: str,
+    body: bytes | None,
+    headers: dict[str, str],
+    max_size: int | None,
+) -> tuple[http.client.HTTPResponse, bytes]:
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response, _read_body(response, max_size)
+    except BaseException:
+        # The rest of the body is left unread, so the connection can't be reused
+        conn.close()
+        raise
+
+
+def _read_body(response: http.client.HTTPResponse, max_size: int | None) -> bytes:
+    length = response.getheader('Content-Length')
+    if max_size is not None and length and length.isdigit() and int(length) > max_size:
+        # No need to download what would be discarded anyway
+        msg = f'Response body of {length} bytes exceeds the limit of {max_size} bytes'
+        raise PageTooLargeError(msg)
+    decoder = _BodyDecoder(response.getheader('Content-Encoding', ''), max_size)
+    while chunk := response.read(_CHUNK_SIZE):
+        decoder.feed(chunk)
+    return decoder.body()
+
+
+class _BodyDecoder:
+    """Incremental decompression of the response body, with its size limit."""
+
+    def __init__(self, encoding: str, max_size: int | None) -> None:
+        encoding = encoding.strip().lower()
+        self.max_size = max_size
+        self._gzip = encoding in {'gzip', 'x-gzip'}
+        self._wbits = 16 + zlib.MAX_WBITS if self._gzip else zlib.MAX_WBITS
+        compressed = self._gzip or encoding == 'deflate'
+        self._decompressor = zlib.decompressobj(self._wbits) if compressed else None
+        self._started = False
+        self._chunks: list[bytes] = []
+        self._size = 0
+
+    def feed(self, data: bytes) -> None:
+        if self._decompressor is None:
+            self._append(data)
+            return
+        while data:
+            # Output is limited to one byte over the limit, so a small
+            # compressed body can't expand into a huge one in memory
+            max_length = self.max_size - self._size + 1 if self.max_size is not None else 0
+            try:
+                out = self._decompressor.decompress(data, max_length)
+            except zlib.error as err:
+                if self._started or self._gzip or self._wbits < 0:
+                    msg = f'Failed to decompress response body: {err}'
+                    raise ContentDecodingError(msg) from err
+                # Some servers send raw deflate stream without zlib header
+                self._wbits = -zlib.MAX_WBITS
+                self._decompressor = zlib.decompressobj(self._wbits)
+                continue
+            self._started = True
+            self._append(out)
+            if self._decompressor.eof and self._gzip:
+                # Gzip body can consist of multiple members
+                data = self._decompressor.unused_data
+                if data:
+                    self._decompressor = zlib.decompressobj(self._wbits)
+            else:
+                data = self._decompressor.unconsumed_tail
+
+    def body(self) -> bytes:
+        if self._started and self._decompressor is not None and not self._decompressor.eof:
+            # The connection was closed before the end of the stream
+            msg = 'Compressed response body is truncated'
+            raise ContentDecodingError(msg)
+        return b''.join(self._chunks)
+
+    def _append(self, data: bytes) -> None:
+        self._size += len(data)
+        if self.max_size is not None and self._size > self.max_size:
+            msg = f'Response body exceeds the limit of {self.max_size} bytes'
+            raise PageTooLargeError(msg)
+        if data:
+            self._chunks.append(data)
@@ -76,6 +76,9 @@ class GancioEvent:
                    days. *Currently* always set to 1.
         tags: List of tags associated with the event.
         image_url: The URL of the image associated with the event.
+        recurrent: How the event repeats, e.g. `{'frequency': '1w'}`.
+                   `None` if it's not a recurrent event, in which case
+                   the field is not sent to Gancio.
 
     """
 
@@ -89,3 +92,4 @@ class GancioEvent:
     multidate: int
     tags: list[str]
     image_url: str | None
+    recurrent: dict[str, object] | None = None
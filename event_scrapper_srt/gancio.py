@@ -1,55 +1,130 @@
 from __future__ import annotations
 
+import http.client
 import json
 import logging
-import urllib.request
+import random
+import time
+import urllib.error
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
+from dataclasses import dataclass
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import TYPE_CHECKING
+from typing import Any
+from zoneinfo import ZoneInfo
 
+from event_scrapper_srt import recurrence
+from event_scrapper_srt import util
 from event_scrapper_srt.event import Event
 from event_scrapper_srt.event import GancioEvent
+from event_scrapper_srt.event import Occurrence
+from event_scrapper_srt.metrics import METRICS
 
+if TYPE_CHECKING:
+    from collections.abc import Container
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from concurrent.futures import Future
 
-def create_events(scrapped_events: list[Event]) -> list[GancioEvent]:
+    from event_scrapper_srt.client import HttpClient
+
+
+# Stable identity of a Gancio event: the source URL and the start time,
+# or the key of the series for recurrent events, see `event_key`
+EventKey = tuple[str, int | str]
+
+# How far ahead the website lists the dates of events. Only runs which
+# continue past it are considered open-ended and made recurrent.
+RECURRENT_HORIZON = timedelta(weeks=4)
+
+_TZ = ZoneInfo('Europe/Warsaw')
+
+
+def create_events(
+    scrapped_events: Iterable[Event],
+    *,
+    recurrent: bool = False,
+    now: datetime | None = None,
+    horizon: timedelta = RECURRENT_HORIZON,
+) -> list[GancioEvent]:
     """Return objects representing future events for Gancio based on scrapped events."""
-    events = []
+    return list(iter_events(scrapped_events, recurrent=recurrent, now=now, horizon=horizon))
+
+
+def iter_events(
+    scrapped_events: Iterable[Event],
+    *,
+    recurrent: bool = False,
+    now: datetime | None = None,
+    horizon: timedelta = RECURRENT_HORIZON,
+) -> Iterator[GancioEvent]:
+    """Yield objects representing future events for Gancio as scrapped events arrive.
+
+    `now` is the reference time for skipping past occurrences, the same
+    for all the events. The current time when the first event arrives if
+    `None`.
+    """
     for scrapped in scrapped_events:
-        events.extend(prepare_event(scrapped))
-    return events
+        now = now or datetime.now(timezone.utc)
+        with METRICS.timer('prepare_event_seconds'):
+            events = prepare_event(scrapped, recurrent=recurrent, now=now, horizon=horizon)
+        METRICS.inc('gancio_events_total', len(events))
+        yield from events
 
 
 def prepare_event(
     event: Event,
+    *,
+    recurrent: bool = False,
+    now: datetime | None = None,
+    horizon: timedelta = RECURRENT_HORIZON,
 ) -> list[GancioEvent]:
     """Prepare one or more Gancio event from a single scrapped event.
 
-    Skips past events.
+    Skips occurrences starting before `now`, the current time if `None`.
+    With `recurrent`, occurrences repeating weekly, bi-weekly, or monthly
+    are collapsed into a single recurrent Gancio event starting at the
+    first of them, see `recurrence.detect_runs`.
+
+    Gancio keeps creating the occurrences of a recurrent event until it's
+    edited, so only runs which look open-ended are collapsed: those whose
+    next occurrence would fall after `now + horizon`, where `horizon` is
+    how far ahead the website lists dates. Runs which ended earlier are
+    prepared as separate events, one per listed date.
     """
-    events = []
-    skipped = 0
+    now = now or datetime.now(timezone.utc)
+    future = []
     for dt in event.date_times:
-        if dt.start < datetime.now(tz=dt.start.tzinfo):
+        if dt.start < now:
             logging.info(f'[{event.title}] Past event occurence found, skipping: {dt.start}')
-            skipped += 1
             continue
-        end_datetime = int(dt.end.timestamp()) if dt.end else None
-        events.append(
-            GancioEvent(
-                title=event.title,
-                description=event.description,
-                place_name=event.place_name,
-                place_address=event.place_address,
-                online_locations=[event.url],
-                start_datetime=int(dt.start.timestamp()),
-                end_datetime=end_datetime,
-                # Always set event as multidate, as it doesn't break
-                # anything, and without it mutlidate events are
-                # incorrectly added.
-                multidate=1,
-                tags=['swing'],
-                image_url=event.image_url,
+        future.append(dt)
+    skipped = len(event.date_times) - len(future)
+
+    if recurrent:
+        runs, irregular = recurrence.detect_runs(future)
+        finite = [run for run in runs if not run.open_ended(now + horizon)]
+        if finite:
+            runs = [run for run in runs if run not in finite]
+            irregular = sorted(
+                [*irregular, *(dt for run in finite for dt in run.occurrences)],
+                key=lambda dt: dt.start,
+            )
+        events = [_to_gancio_event(event, dt) for dt in irregular]
+        events.extend(_to_gancio_event(event, run.occurrences[0], run.recurrent()) for run in runs)
+        events.sort(key=lambda gancio_event: gancio_event.start_datetime)
+        if runs:
+            logging.info(
+                f'[{event.title}] Collapsed {len(future) - len(irregular)} occurrences '
+                f'into {len(runs)} recurrent events'
             )
-        )
+    else:
+        events = [_to_gancio_event(event, dt) for dt in future]
+
     if not events:
         logging.info(f'[{event.title}] No Gancio events created: no future `date_times` found')
         return []
@@ -62,11 +137,207 @@ def prepare_event(
         return events
 
 
-def add_event(event: GancioEvent, instance_url: str) -> dict[str, object]:
+def _to_gancio_event(
+    event: Event, dt: Occurrence, recurrent: dict[str, object] | None = None
+) -> GancioEvent:
+    end_datetime = int(dt.end.timestamp()) if dt.end else None
+    return GancioEvent(
+        title=event.title,
+        description=event.description,
+        place_name=event.place_name,
+        place_address=event.place_address,
+        online_locations=[event.url],
+        start_datetime=int(dt.start.timestamp()),
+        end_datetime=end_datetime,
+        # Always set event as multidate, as it doesn't break
+        # anything, and without it mutlidate events are
+        # incorrectly added. Gancio doesn't support multidate
+        # recurrent events though.
+        multidate=0 if recurrent else 1,
+        tags=['swing'],
+        image_url=event.image_url,
+        recurrent=recurrent,
+    )
+
+
+def to_dict(event: GancioEvent) -> dict[str, object]:
+    """Return the body of the request creating the event in Gancio."""
+    data = asdict(event)
+    if data['recurrent'] is None:
+        del data['recurrent']
+    return data
+
+
+def add_event(
+    event: GancioEvent, instance_url: str, client: HttpClient = util.DEFAULT_CLIENT
+) -> dict[str, object]:
     url = f'{instance_url}/api/event'
-    data = json.dumps(asdict(event)).encode()
+    data = json.dumps(to_dict(event)).encode()
     headers = {'Content-Type': 'application/json'}
-    resp = urllib.request.urlopen(
-        urllib.request.Request(url, data=data, headers=headers, method='POST')
+    resp = client.request('POST', url, body=data, headers=headers)
+    return json.loads(resp.body)
+
+
+@dataclass(frozen=True)
+class PublishResult:
+    """Outcome of publishing a single event to Gancio.
+
+    Args:
+    ----
+        event: The published event.
+        response: The event created by Gancio. `None` if publishing failed.
+        error: The description of the last error. `None` if publishing
+               succeeded.
+        attempts: The number of requests sent for the event.
+
+    """
+
+    event: GancioEvent
+    response: dict[str, object] | None
+    error: str | None
+    attempts: int
+
+    @property
+    def ok(self) -> bool:
+        """Whether the event was published."""
+        return self.error is None
+
+
+def publish_events(
+    events: Iterable[GancioEvent],
+    instance_url: str,
+    client: HttpClient = util.DEFAULT_CLIENT,
+    max_in_flight: int = 4,
+    rate: float = 5.0,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> list[PublishResult]:
+    """Publish events to Gancio concurrently.
+
+    Args:
+    ----
+        events: The events to publish.
+        instance_url: The URL of the Gancio instance.
+        client: HTTP client used to send the requests.
+        max_in_flight: The maximum number of requests sent at the same time.
+        rate: The maximum number of requests sent per second.
+        retries: How many times a request is retried after a server error
+                 (5xx) or a connection error.
+        backoff: The base delay in seconds of the exponential backoff
+                 between retries. Actual delay is randomized.
+
+    """
+    bucket = util.TokenBucket(rate, capacity=max(1.0, rate))
+
+    def publish(event: GancioEvent) -> PublishResult:
+        attempt = 0
+        while True:
+            attempt += 1
+            bucket.acquire()
+            try:
+                response = add_event(event, instance_url, client=client)
+            except urllib.error.HTTPError as err:
+                error = f'HTTP {err.code} {err.reason}'
+                retryable = err.code >= 500
+            except (OSError, http.client.HTTPException) as err:
+                error = str(err) or type(err).__name__
+                retryable = True
+            except ValueError as err:
+                # A successful response which isn't the created event
+                error = f'Invalid response: {err}'
+                retryable = False
+            else:
+                logging.info(f'[{event.title}] Published event starting at {event.start_datetime}')
+                return PublishResult(event=event, response=response, error=None, attempts=attempt)
+
+            if not retryable or attempt > retries:
+                logging.warning(
+                    f'[{event.title}] Failed to publish event starting at '
+                    f'{event.start_datetime} after {attempt} attempts: {error}'
+                )
+                return PublishResult(event=event, response=None, error=error, attempts=attempt)
+            time.sleep(random.uniform(0, backoff * 2 ** (attempt - 1)))
+
+    start = time.monotonic()
+    # Only a limited number of events is submitted ahead of the finished
+    # ones, so the events are consumed as they are published
+    window = max(max_in_flight, 1) * 2
+    results = []
+    pending: deque[Future[PublishResult]] = deque()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for event in events:
+            pending.append(executor.submit(publish, event))
+            if len(pending) >= window:
+                results.append(pending.popleft().result())
+        results.extend(future.result() for future in pending)
+    elapsed = time.monotonic() - start
+
+    published = sum(result.ok for result in results)
+    logging.info(
+        f'Published {published} of {len(results)} events in {elapsed:.2f}s '
+        f'({published / elapsed if elapsed else 0:.1f} events/s), '
+        f'{len(results) - published} failed'
+    )
+    return results
+
+
+def event_key(event: GancioEvent) -> EventKey:
+    """Return the key identifying the event across runs.
+
+    A recurrent event is identified by its series, see
+    `recurrence.series_key`, rather than by its start time, as the start
+    moves to the next occurrence once the earliest one passes.
+    """
+    if event.recurrent:
+        start = datetime.fromtimestamp(event.start_datetime, tz=_TZ)
+        return event.online_locations[0], recurrence.series_key(start, event.recurrent)
+    return event.online_locations[0], event.start_datetime
+
+
+def fetch_published_keys(
+    instance_url: str, client: HttpClient = util.DEFAULT_CLIENT
+) -> set[EventKey]:
+    """Return keys of the future events already published on the Gancio instance.
+
+    Occurrences of recurrent events are listed as well, and the series
+    they belong to is added, if Gancio includes its `recurrent` field.
+
+    **PLEASE NOTE** that Gancio lists only confirmed events, so events
+    waiting for moderation are not found here. Use a ledger to track them.
+    """
+    resp = client.request(
+        'GET', f'{instance_url}/api/events?start={int(time.time())}&show_recurrent=true'
     )
-    return json.load(resp)
+    keys: set[EventKey] = set()
+    for event in json.loads(resp.body):
+        if event.get('online_locations'):
+            url = event['online_locations'][0]
+            keys.add((url, event['start_datetime']))
+            recurrent = event.get('recurrent') or (event.get('parent') or {}).get('recurrent')
+            if recurrent:
+                start = datetime.fromtimestamp(event['start_datetime'], tz=_TZ)
+                keys.add((url, recurrence.series_key(start, recurrent)))
+    logging.info(f'Found {len(keys)} events already published on {instance_url}')
+    return keys
+
+
+def sync_events(
+    events: Iterable[GancioEvent],
+    instance_url: str,
+    published: Container[EventKey],
+    client: HttpClient = util.DEFAULT_CLIENT,
+    **kwargs: Any,
+) -> list[PublishResult]:
+    """Publish only the events which are not in `published` yet.
+
+    Other keyword arguments are passed to `publish_events`.
+    """
+    new_events = []
+    skipped = 0
+    for event in events:
+        if event_key(event) in published:
+            skipped += 1
+        else:
+            new_events.append(event)
+    logging.info(f'Skipping {skipped} already published events')
+    return publish_events(new_events, instance_url, client=client, **kwargs)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import os
+
+    from event_scrapper_srt.gancio import EventKey
+
+
+def load_ledger(path: str | os.PathLike[str]) -> dict[EventKey, object]:
+    """Load keys of the published events and their Gancio IDs.
+
+    Return empty ledger if the file doesn't exist.
+    """
+    try:
+        raw = json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        logging.info(f'Ledger file `{path}` not found, starting from scratch')
+        return {}
+    return {
+        (entry['url'], entry['series'] if 'series' in entry else entry['start_datetime']): entry[
+            'id'
+        ]
+        for entry in raw
+    }
+
+
+def save_ledger(path: str | os.PathLike[str], ledger: dict[EventKey, object]) -> None:
+    """Save the ledger file, replacing it atomically."""
+    # Recurrent events are keyed by their series, rather than start time
+    raw = [
+        {'url': url, 'series' if isinstance(start, str) else 'start_datetime': start, 'id': id_}
+        for (url, start), id_ in sorted(
+            ledger.items(), key=lambda item: (item[0][0], isinstance(item[0][1], str), item[0][1])
+        )
+    ]
+    path = Path(path)
+    tmp_path = path.with_name(f'{path.name}.tmp')
+    tmp_path.write_text(json.dumps(raw, indent=1))
+    tmp_path.replace(path)
@@ -1,21 +1,39 @@
 from __future__ import annotations
 
 import argparse
-import json
+import contextlib
+import itertools
 import logging
 import sys
-from dataclasses import asdict
 from typing import TYPE_CHECKING
 
-from event_scrapper_srt import gancio
-from event_scrapper_srt import scrapper
-from event_scrapper_srt import sitemap
+from event_scrapper_srt.metrics import METRICS
+
+# Other modules of the app are imported by the commands which need them,
+# as importing HTML parsers and HTTP client makes the startup several
+# times slower. `tests/startup_test.py` keeps an eye on it.
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from datetime import datetime
+    from datetime import timedelta
+
+    from event_scrapper_srt.cache import HttpCache
+    from event_scrapper_srt.event import Event
     from event_scrapper_srt.event import GancioEvent
 
 SITEMAP_URL = 'https://swingrevolution.pl/events-sitemap.xml'
 
+OUTPUT_FORMATS = ('events', 'grouped')
+
+# Names of `scrapper.ENGINES`, listed here to not import the parsers at startup
+ENGINES = ('bs4', 'lxml')
+
+# Dates and times without timezone given in the CLI are in the timezone of the events
+EVENTS_TZ = 'Europe/Warsaw'
+
 
 def main(argv: list[str] | None = None) -> int:
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,23 +43,600 @@ def main(argv: list[str] | None = None) -> int:
         default=SITEMAP_URL,
         help='events are scrapped from here (default: %(default)s)',
     )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=1,
+        help='number of event pages downloaded at the same time (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        default=0,
+        help='number of processes parsing event pages, 0 parses in the main process '
+        '(default: %(default)s)',
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='bs4',
+        help='HTML extraction engine (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=30.0,
+        help='seconds to wait for the server to connect or send data (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--max-page-size',
+        type=float,
+        default=10.0,
+        help='skip pages larger than this many MB, checked while downloading '
+        '(default: %(default)s)',
+    )
+    parser.add_argument(
+        '--fetch-retries',
+        type=int,
+        default=2,
+        help='retries after a server or connection error (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='send a duplicate request if a page takes longer than 95%% of recent ones',
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='cache fetched pages in this directory and revalidate them on later runs',
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=100,
+        help='maximum size of the cache in MB (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--archive',
+        help='store every fetched sitemap and page in this archive directory',
+    )
+    parser.add_argument(
+        '--replay',
+        metavar='ARCHIVE',
+        help='scrap pages stored with --archive instead of fetching them',
+    )
+    parser.add_argument(
+        '--shard',
+        type=_shard,
+        metavar='I/N',
+        help='scrap only the I-th of N disjoint subsets of the sitemap, combine outputs '
+        'of all the shards with the merge command',
+    )
+    parser.add_argument(
+        '--state-file',
+        help='scrap only events changed since the run which saved this file',
+    )
+    parser.add_argument(
+        '--format',
+        choices=OUTPUT_FORMATS,
+        default='events',
+        help='write one line per Gancio event, or one line per scrapped event with '
+        'its occurrences (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--recurrent',
+        action='store_true',
+        help='collapse occurrences repeating weekly, bi-weekly or monthly into recurrent '
+        'Gancio events',
+    )
+    parser.add_argument(
+        '--recurrent-horizon',
+        type=int,
+        default=28,
+        metavar='DAYS',
+        help='how many days ahead the website lists dates, only repetitions continuing '
+        'past it are made recurrent (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--future-only',
+        action='store_true',
+        help='parse the dates of each page first, and skip the rest of pages with no future '
+        'occurrences',
+    )
+    parser.add_argument(
+        '--output',
+        type=_output,
+        default='-',
+        help='write events to stdout (`-`), or upsert them into SQLite database '
+        '(`sqlite:PATH`) (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--metrics-json',
+        help='write timing and throughput metrics of the run to this JSON file',
+    )
+    parser.add_argument(
+        '--metrics-prom',
+        help='write the metrics to this file for Prometheus textfile collector',
+    )
+    subparsers = parser.add_subparsers(dest='command', title='commands')
+
+    publish_parser = subparsers.add_parser(
+        'publish', help='publish scrapped events to Gancio instead of scrapping'
+    )
+    publish_parser.add_argument(
+        'input',
+        nargs='?',
+        type=argparse.FileType(encoding='utf-8'),
+        default=sys.stdin,
+        help='NDJSON file with events written by the scrapper in any format (default: stdin)',
+    )
+    publish_parser.add_argument('--instance-url', required=True, help='URL of the Gancio instance')
+    publish_parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=4,
+        help='maximum number of requests sent at the same time (default: %(default)s)',
+    )
+    publish_parser.add_argument(
+        '--rate',
+        type=_positive,
+        default=5.0,
+        help='maximum number of requests sent per second (default: %(default)s)',
+    )
+    publish_parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        help='retries after a server or connection error (default: %(default)s)',
+    )
+
+    publish_parser.add_argument(
+        '--sync',
+        action='store_true',
+        help='skip events already published on the instance or recorded in the ledger',
+    )
+    publish_parser.add_argument(
+        '--ledger',
+        help='file recording published events, used and updated by --sync',
+    )
+
+    events_parser = subparsers.add_parser(
+        'events', help='query events stored with --output sqlite:PATH instead of scrapping'
+    )
+    events_parser.add_argument('database', help='path of the SQLite database')
+    events_parser.add_argument(
+        '--from',
+        dest='start_from',
+        type=_timestamp,
+        help='only events starting at or after this ISO date or datetime',
+    )
+    events_parser.add_argument(
+        '--to',
+        dest='start_to',
+        type=_timestamp,
+        help='only events starting before this ISO date or datetime',
+    )
+    events_parser.add_argument('--place', help='only events taking place there')
+
+    merge_parser = subparsers.add_parser(
+        'merge',
+        help='merge outputs of --shard runs in the order of the sitemap instead of scrapping',
+    )
+    merge_parser.add_argument(
+        'inputs',
+        nargs='+',
+        type=argparse.FileType(encoding='utf-8'),
+        help='NDJSON files written by the shards',
+    )
+
+    watch_parser = subparsers.add_parser(
+        'watch',
+        help='keep polling the sitemap and output only new or changed events',
+    )
+    watch_parser.add_argument(
+        '--min-interval',
+        type=float,
+        default=60,
+        help='shortest time between polls in seconds, used while the sitemap changes '
+        '(default: %(default)s)',
+    )
+    watch_parser.add_argument(
+        '--max-interval',
+        type=float,
+        default=3600,
+        help='longest time between polls in seconds, reached while the sitemap '
+        "doesn't change (default: %(default)s)",
+    )
+    watch_parser.add_argument(
+        '--max-cycles',
+        type=int,
+        help='stop after this number of polls (default: run forever)',
+    )
+
     args = parser.parse_args(argv)
+    if args.future_only and args.state_file:
+        # The state stores whole events, which skipped pages don't have
+        parser.error('--future-only cannot be used with --state-file')
+    if args.command == 'watch':
+        # Watch polls the whole live sitemap and compares every event to the
+        # last cycle, while a replayed archive never changes
+        for option, value in (
+            ('--shard', args.shard),
+            ('--future-only', args.future_only),
+            ('--replay', args.replay),
+        ):
+            if value:
+                parser.error(f'{option} cannot be used with watch')
+    METRICS.enabled = bool(args.metrics_json or args.metrics_prom)
+    try:
+        with METRICS.timer('run_seconds', command=args.command or 'scrape'):
+            if args.command == 'publish':
+                return _publish(args)
+            if args.command == 'events':
+                return _query_events(args)
+            if args.command == 'watch':
+                return _watch(args)
+            if args.command == 'merge':
+                return _merge(args)
+            return _scrape(args)
+    finally:
+        peak_rss = _peak_rss()
+        if peak_rss is not None:
+            logging.info(f'Peak RSS: {peak_rss / 2**20:.1f} MB')
+            METRICS.set('peak_rss_bytes', peak_rss)
+        if args.metrics_json:
+            METRICS.write_json(args.metrics_json)
+        if args.metrics_prom:
+            METRICS.write_prometheus(args.metrics_prom)
+
+
+def _peak_rss() -> int | None:
+    """Return the peak resident set size of the process in bytes."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux, and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextlib.contextmanager
+def _fetching(
+    args: argparse.Namespace,
+) -> Iterator[tuple[Callable[[str], bytes], HttpCache | None, datetime | None]]:
+    """Yield content getter, its HTTP cache, and the reference time of the sitemap.
+
+    Connections and threads used for fetching are closed on exit.
+    """
+    from event_scrapper_srt.archive import PageArchive
+    from event_scrapper_srt.cache import HttpCache
+    from event_scrapper_srt.client import HttpClient
+    from event_scrapper_srt.policy import FetchPolicy
+
+    cache = HttpCache(args.cache_dir, max_size=args.cache_size * 2**20) if args.cache_dir else None
+    client = HttpClient(
+        connect_timeout=args.timeout,
+        read_timeout=args.timeout,
+        cache=cache,
+        max_body_size=int(args.max_page_size * 2**20),
+    )
+    policy = FetchPolicy(client.get_content, retries=args.fetch_retries, hedge=args.hedge)
+    content_getter: Callable[[str], bytes] = policy.get_content
+    now = None
+    if args.replay:
+        replayed = PageArchive(args.replay)
+        content_getter = replayed.get_content
+        # Sitemap is filtered as of the time it was archived
+        now = replayed.fetched_at(args.sitemap_url)
+    if args.archive:
+        content_getter = PageArchive(args.archive).recording(content_getter)
+    try:
+        yield content_getter, cache, now
+    finally:
+        policy.close()
+        client.close()
+
+
+def _scrape(args: argparse.Namespace) -> int:
+    from datetime import datetime
+    from datetime import timedelta
+    from datetime import timezone
+
+    from event_scrapper_srt import scrapper
+    from event_scrapper_srt import shard
+    from event_scrapper_srt import sitemap
+    from event_scrapper_srt import state
+
+    with _fetching(args) as (content_getter, cache, now):
+        # Past occurrences are skipped as of the same time for the whole
+        # run. A replay uses the time when the archive was fetched.
+        started_at = now or datetime.now(timezone.utc)
+        elements = sitemap.fetch_elements(
+            args.sitemap_url,
+            content_getter=content_getter,
+            concurrency=args.concurrency,
+            now=now,
+        )
+        if args.shard:
+            index, count = args.shard
+            all_elements = elements
+            elements = [elem for elem in all_elements if shard.in_shard(elem.url, index, count)]
+            logging.info(f'Shard {index}/{count}: {len(elements)} of {len(all_elements)} events')
+
+        events: Iterable[Event]
+        if args.state_file:
+            events, new_state = scrapper.get_events_incremental(
+                elements,
+                state.load_state(args.state_file),
+                content_getter=content_getter,
+                concurrency=args.concurrency,
+                engine=args.engine,
+                parse_workers=args.parse_workers,
+            )
+            state.save_state(args.state_file, new_state)
+        else:
+            events = scrapper.iter_events(
+                [elem.url for elem in elements],
+                content_getter=content_getter,
+                concurrency=args.concurrency,
+                engine=args.engine,
+                parse_workers=args.parse_workers,
+                after=started_at if args.future_only else None,
+            )
+        if args.output.startswith('sqlite:'):
+            logging.info(f'Storing output in `{args.output}`...')
+            count = _store_pages(
+                events,
+                args.output.removeprefix('sqlite:'),
+                started_at,
+                recurrent=args.recurrent,
+                horizon=timedelta(days=args.recurrent_horizon),
+            )
+        else:
+            logging.info('Dumping output to stdout...')
+            count = _dump_pages(
+                events,
+                args.format,
+                started_at,
+                recurrent=args.recurrent,
+                horizon=timedelta(days=args.recurrent_horizon),
+            )
+        logging.info(f'In total prepared {count} events for Gancio')
+        if cache:
+            logging.info(f'HTTP cache: {cache.hits} hits, {cache.misses} misses')
+
+        return 0
+
+
+def _watch(args: argparse.Namespace) -> int:
+    from datetime import timedelta
+
+    from event_scrapper_srt import ndjson
+    from event_scrapper_srt import state
+    from event_scrapper_srt import store
+    from event_scrapper_srt import watch
+
+    with _fetching(args) as (content_getter, cache, _):
+        cycles = watch.watch(
+            args.sitemap_url,
+            state.load_state(args.state_file) if args.state_file else {},
+            watch.AdaptiveInterval(args.min_interval, args.max_interval),
+            content_getter=content_getter,
+            concurrency=args.concurrency,
+            engine=args.engine,
+            parse_workers=args.parse_workers,
+            recurrent=args.recurrent,
+            horizon=timedelta(days=args.recurrent_horizon),
+            max_cycles=args.max_cycles,
+        )
+        event_store = None
+        if args.output.startswith('sqlite:'):
+            event_store = store.EventStore(args.output.removeprefix('sqlite:'))
+        writer = ndjson.NdjsonWriter(sys.stdout)
+        try:
+            for cycle in cycles:
+                for event, gancio_events in cycle.updates:
+                    if event_store:
+                        event_store.add(event, gancio_events)
+                    elif args.format == 'grouped':
+                        writer.write_group(gancio_events)
+                    else:
+                        for gancio_event in gancio_events:
+                            writer.write(gancio_event)
+                if event_store:
+                    event_store.commit()
+                writer.flush()
+                if args.state_file:
+                    state.save_state(args.state_file, cycle.state)
+                if cache:
+                    logging.info(f'HTTP cache: {cache.hits} hits, {cache.misses} misses')
+        finally:
+            if event_store:
+                event_store.close()
+        return 0
 
-    events = scrapper.get_events(sitemap.get_urls(args.sitemap_url))
-    gancio_events = gancio.create_events(events)
-    logging.info(f'In total prepared {len(gancio_events)} events for Gancio')
-    logging.info('Dumping output to stdout...')
 
-    dump_events_to_json(gancio_events)
+def _merge(args: argparse.Namespace) -> int:
+    from event_scrapper_srt import shard
+    from event_scrapper_srt import sitemap
 
+    with _fetching(args) as (content_getter, _, now):
+        urls = sitemap.get_urls(
+            args.sitemap_url,
+            content_getter=content_getter,
+            now=now,
+            concurrency=args.concurrency,
+        )
+        try:
+            for line in shard.merge(args.inputs, urls):
+                sys.stdout.write(line)
+        finally:
+            for input_file in args.inputs:
+                input_file.close()
+        sys.stdout.flush()
+        return 0
+
+
+def _publish(args: argparse.Namespace) -> int:
+    from event_scrapper_srt import gancio
+    from event_scrapper_srt import ledger
+    from event_scrapper_srt import ndjson
+
+    options = {
+        'max_in_flight': args.max_in_flight,
+        'rate': args.rate,
+        'retries': args.retries,
+    }
+    with args.input:
+        events = ndjson.read_events(args.input)
+        if not args.sync:
+            results = gancio.publish_events(events, args.instance_url, **options)
+            return 0 if all(result.ok for result in results) else 1
+
+        published = ledger.load_ledger(args.ledger) if args.ledger else {}
+        keys = set(published) | gancio.fetch_published_keys(args.instance_url)
+        results = gancio.sync_events(events, args.instance_url, keys, **options)
+
+    if args.ledger:
+        for result in results:
+            if result.response is not None:
+                published[gancio.event_key(result.event)] = result.response.get('id')
+        ledger.save_ledger(args.ledger, published)
+    return 0 if all(result.ok for result in results) else 1
+
+
+def _query_events(args: argparse.Namespace) -> int:
+    from event_scrapper_srt import store
+
+    with store.EventStore(args.database) as event_store:
+        events = event_store.query(args.start_from, args.start_to, args.place)
+    dump_events_to_json(events)
     return 0
 
 
-def dump_events_to_json(events: list[GancioEvent]) -> None:
-    """Dump scrapped events to stdout as Newline Delimited JSON."""
+def dump_events_to_json(events: Iterable[GancioEvent], output_format: str = 'events') -> int:
+    """Dump scrapped events to stdout as Newline Delimited JSON.
+
+    With `grouped` format, consecutive events from the same page are
+    written as a single line. Returns the number of dumped events.
+    """
+    from event_scrapper_srt import ndjson
+
+    writer = ndjson.NdjsonWriter(sys.stdout)
+    if output_format == 'grouped':
+        for _, group in itertools.groupby(events, key=lambda event: event.online_locations):
+            writer.write_group(list(group))
+    else:
+        for event in events:
+            writer.write(event)
+    with METRICS.timer('output_flush_seconds'):
+        writer.flush()
+    METRICS.inc('output_events_total', writer.count)
+    return writer.count
+
+
+def _dump_pages(
+    events: Iterable[Event],
+    output_format: str,
+    now: datetime | None = None,
+    *,
+    recurrent: bool = False,
+    horizon: timedelta | None = None,
+) -> int:
+    """Dump Gancio events created from scrapped events to stdout.
+
+    Output of each scrapped page is written and flushed as soon as the
+    page is done, so it can be consumed while next pages are scrapped.
+    Returns the number of dumped events.
+    """
+    from event_scrapper_srt import gancio
+    from event_scrapper_srt import ndjson
+
+    writer = ndjson.NdjsonWriter(sys.stdout)
     for event in events:
-        json.dump(asdict(event), sys.stdout, indent=None, ensure_ascii=False, default=str)
-        print()
+        gancio_events = gancio.iter_events(
+            [event], recurrent=recurrent, now=now, horizon=horizon or gancio.RECURRENT_HORIZON
+        )
+        if output_format == 'grouped':
+            writer.write_group(list(gancio_events))
+        else:
+            for gancio_event in gancio_events:
+                writer.write(gancio_event)
+        with METRICS.timer('output_flush_seconds'):
+            writer.flush()
+    METRICS.inc('output_events_total', writer.count)
+    return writer.count
+
+
+def _store_pages(
+    events: Iterable[Event],
+    path: str,
+    now: datetime | None = None,
+    *,
+    recurrent: bool = False,
+    horizon: timedelta | None = None,
+) -> int:
+    """Upsert scrapped events and Gancio events created from them into the database.
+
+    Returns the number of stored Gancio events.
+    """
+    from event_scrapper_srt import gancio
+    from event_scrapper_srt import store
+
+    count = 0
+    with store.EventStore(path) as event_store:
+        for event in events:
+            gancio_events = list(
+                gancio.iter_events(
+                    [event],
+                    recurrent=recurrent,
+                    now=now,
+                    horizon=horizon or gancio.RECURRENT_HORIZON,
+                )
+            )
+            event_store.add(event, gancio_events)
+            count += len(gancio_events)
+    METRICS.inc('output_events_total', count)
+    return count
+
+
+def _output(value: str) -> str:
+    if value != '-' and not value.startswith('sqlite:'):
+        msg = f'expected `-` or `sqlite:PATH`, got `{value}`'
+        raise argparse.ArgumentTypeError(msg)
+    return value
+
+
+def _positive(value: str) -> float:
+    number = float(value)
+    if number <= 0:
+        msg = f'expected a positive number, got `{value}`'
+        raise argparse.ArgumentTypeError(msg)
+    return number
+
+
+def _shard(value: str) -> tuple[int, int]:
+    from event_scrapper_srt import shard
+
+    try:
+        return shard.parse_shard(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err)) from None
+
+
+def _timestamp(value: str) -> int:
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err)) from None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo(EVENTS_TZ))
+    return int(dt.timestamp())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+
+if TYPE_CHECKING:
+    import os
+    from collections.abc import Iterator
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+_Key = tuple[str, tuple[tuple[str, str], ...]]
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Metrics:
+    """Registry of counters, gauges and latency histograms.
+
+    Disabled by default, in which case recording is a single attribute
+    check, so instrumentation can stay in the hot paths.
+
+    Metric names follow Prometheus conventions, e.g. `page_fetch_seconds`
+    for histograms and `page_fetch_bytes_total` for counters. Optional
+    labels are passed as keyword arguments.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._counters: defaultdict[_Key, float] = defaultdict(float)
+        self._gauges: dict[_Key, float] = {}
+        self._histograms: dict[_Key, _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """Increase the counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] += value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        """Set the gauge to the value."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name, tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record the value in the latency histogram."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = _Histogram(LATENCY_BUCKETS)
+            self._histograms[key].observe(value)
+
+    def timer(self, name: str, **labels: str) -> contextlib.AbstractContextManager[None]:
+        """Return context manager recording its duration in the histogram."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._timer(name, **labels)
+
+    @contextlib.contextmanager
+    def _timer(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self) -> None:
+        """Remove all the recorded values."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def summary(self) -> dict[str, Any]:
+        """Return the recorded values as JSON-serializable dict."""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._gauges.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': hist.count,
+                    'sum': hist.sum,
+                    'mean': hist.sum / hist.count,
+                    'min': hist.min,
+                    'max': hist.max,
+                    'buckets': {
+                        _format_bound(bound): count
+                        for bound, count in zip(hist.buckets, hist.counts)
+                    },
+                }
+                for (name, labels), hist in sorted(self._histograms.items())
+            ]
+        return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+    def write_json(self, path: str | os.PathLike[str]) -> None:
+        """Write the summary to the JSON file."""
+        Path(path).write_text(json.dumps(self.summary(), indent=2))
+
+    def write_prometheus(self, path: str | os.PathLike[str], prefix: str = 'srt_') -> None:
+        """Write the metrics in the format of node exporter textfile collector.
+
+        The file is replaced atomically, as the collector may read it at
+        any time.
+        """
+        lines = []
+        typed: set[str] = set()
+
+        def family(name: str, kind: str) -> None:
+            # The type is declared once, before all the samples of the metric
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {prefix}{name} {kind}')
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                family(name, 'counter')
+                lines.append(f'{prefix}{name}{_format_labels(labels)} {value}')
+            for (name, labels), value in sorted(self._gauges.items()):
+                family(name, 'gauge')
+                lines.append(f'{prefix}{name}{_format_labels(labels)} {value}')
+            for (name, labels), hist in sorted(self._histograms.items()):
+                family(name, 'histogram')
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    bucket_labels = (*labels, ('le', _format_bound(bound)))
+                    lines.append(
+                        f'{prefix}{name}_bucket{_format_labels(bucket_labels)} {cumulative}'
+                    )
+                lines.append(f'{prefix}{name}_sum{_format_labels(labels)} {hist.sum}')
+                lines.append(f'{prefix}{name}_count{_format_labels(labels)} {hist.count}')
+        path = Path(path)
+        tmp_path = path.with_name(f'{path.name}.tmp')
+        tmp_path.write_text('\n'.join(lines) + '\n')
+        tmp_path.replace(path)
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if math.isinf(bound) else str(bound)
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Registry used by the whole app, enabled by the CLI when metrics are requested
+METRICS = Metrics()
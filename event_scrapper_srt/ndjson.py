@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+from typing import Any
+
+from event_scrapper_srt.event import GancioEvent
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from typing import TextIO
+
+# Each cache holds fragments of recently written events. All occurrences
+# of a scrapped event come one after another, so a small cache is enough.
+_CACHE_SIZE = 256
+
+
+class NdjsonWriter:
+    """Writer of Gancio events as Newline Delimited JSON.
+
+    Each line holds one Gancio event, or all occurrences of one scrapped
+    event with `write_group`. Output of `write` is byte-identical to
+    `json.dump(gancio.to_dict(event), ensure_ascii=False)` followed by a
+    newline, but it's built without `asdict`, and encoded fragments shared
+    by all occurrences of one scrapped event (title, description, place,
+    image) are cached. Lines are buffered and written in chunks of
+    `chunk_size` characters, and on `flush`.
+
+    Args:
+    ----
+        stream: The text stream the events are written to.
+        chunk_size: The number of buffered characters which triggers a write.
+
+    """
+
+    def __init__(self, stream: TextIO, chunk_size: int = 2**16) -> None:
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._buffer: list[str] = []
+        self._buffered = 0
+        self._heads: dict[tuple[str, str, str, str, tuple[str, ...]], str] = {}
+        self._tails: dict[tuple[int, tuple[str, ...], str | None], str] = {}
+
+    def write(self, event: GancioEvent) -> None:
+        """Buffer the event, writing the buffer if it's full."""
+        line = self.encode(event)
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.count += 1
+        if self._buffered >= self.chunk_size:
+            self._write_buffer()
+
+    def write_group(self, events: list[GancioEvent]) -> None:
+        """Buffer occurrences of one scrapped event as grouped lines.
+
+        Fields shared by the occurrences are written once, followed by
+        `occurrences`, a list of `[start_datetime, end_datetime]` pairs.
+        All the events must come from the same scrapped event. A new line
+        is started whenever the other fields change, e.g. at a recurrent
+        event, so the events are read back in the same order.
+        """
+        start = 0
+        for index in range(1, len(events) + 1):
+            if index == len(events) or _group_key(events[index]) != _group_key(events[start]):
+                self._write_run(events[start:index])
+                start = index
+
+    def flush(self) -> None:
+        """Write the buffered events and flush the stream."""
+        self._write_buffer()
+        self.stream.flush()
+
+    def encode(self, event: GancioEvent) -> str:
+        """Return the event encoded as a single line, including the newline."""
+        head_key = (
+            event.title,
+            event.description,
+            event.place_name,
+            event.place_address,
+            tuple(event.online_locations),
+        )
+        if (head := self._heads.get(head_key)) is None:
+            head = self._heads[head_key] = (
+                f'{{"title": {_dumps(event.title)}, '
+                f'"description": {_dumps(event.description)}, '
+                f'"place_name": {_dumps(event.place_name)}, '
+                f'"place_address": {_dumps(event.place_address)}, '
+                f'"online_locations": {_dumps(event.online_locations)}, '
+                '"start_datetime": '
+            )
+            _limit(self._heads)
+
+        tail_key = (event.multidate, tuple(event.tags), event.image_url)
+        if (tail := self._tails.get(tail_key)) is None:
+            tail = self._tails[tail_key] = (
+                f', "multidate": {_dumps(event.multidate)}, '
+                f'"tags": {_dumps(event.tags)}, '
+                f'"image_url": {_dumps(event.image_url)}}}\n'
+            )
+            _limit(self._tails)
+        if event.recurrent is not None:
+            # Recurrent events are rare, so this part is not cached
+            tail = f'{tail[:-2]}, "recurrent": {_dumps(event.recurrent)}}}\n'
+
+        return (
+            f'{head}{_dumps_int(event.start_datetime)}, '
+            f'"end_datetime": {_dumps_int(event.end_datetime)}{tail}'
+        )
+
+    def _write_run(self, events: list[GancioEvent]) -> None:
+        first = events[0]
+        group = {
+            'title': first.title,
+            'description': first.description,
+            'place_name': first.place_name,
+            'place_address': first.place_address,
+            'online_locations': first.online_locations,
+            'multidate': first.multidate,
+            'tags': first.tags,
+            'image_url': first.image_url,
+            'occurrences': [[event.start_datetime, event.end_datetime] for event in events],
+        }
+        if first.recurrent is not None:
+            group['recurrent'] = first.recurrent
+        line = _dumps(group) + '\n'
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.count += len(events)
+        if self._buffered >= self.chunk_size:
+            self._write_buffer()
+
+    def _write_buffer(self) -> None:
+        if self._buffer:
+            self.stream.write(''.join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+
+def _group_key(event: GancioEvent) -> tuple[object, ...]:
+    # All the fields except the start and end time
+    return (
+        event.title,
+        event.description,
+        event.place_name,
+        event.place_address,
+        event.online_locations,
+        event.multidate,
+        event.tags,
+        event.image_url,
+        event.recurrent,
+    )
+
+
+def _dumps(value: object) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _dumps_int(value: int | None) -> str:
+    # Fast path for the common case, `json` renders ints with `int.__repr__`
+    if type(value) is int:
+        return int.__repr__(value)
+    return _dumps(value)
+
+
+def _limit(cache: dict[Any, str]) -> None:
+    if len(cache) > _CACHE_SIZE:
+        del cache[next(iter(cache))]
+
+
+def read_events(lines: Iterable[str]) -> Iterator[GancioEvent]:
+    """Read Gancio events from Newline Delimited JSON written by the scrapper.
+
+    Both formats are supported: one Gancio event per line, and grouped
+    lines with `occurrences`, which are expanded to Gancio events lazily.
+    Expanded events share the lists of the grouped line.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        raw = json.loads(line)
+        occurrences = raw.pop('occurrences', None)
+        if occurrences is None:
+            yield GancioEvent(**raw)
+            continue
+        for start_datetime, end_datetime in occurrences:
+            yield GancioEvent(**raw, start_datetime=start_datetime, end_datetime=end_datetime)
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import http.client
+import logging
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import TYPE_CHECKING
+
+from event_scrapper_srt.client import PageTooLargeError
+from event_scrapper_srt.metrics import METRICS
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Future
+
+
+class CircuitOpenError(OSError):
+    """Request not sent, as the host failed too many times recently."""
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit of the
+    host opens, and requests to it fail immediately for `reset_after`
+    seconds. Then a single trial request is let through: the circuit
+    closes if it succeeds, and opens again if it fails.
+
+    Args:
+    ----
+        failure_threshold: The number of consecutive failures opening the circuit.
+        reset_after: How long in seconds the circuit stays open.
+        clock: Function returning monotonic time in seconds.
+
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._trial: set[str] = set()
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str) -> None:
+        """Raise `CircuitOpenError` if the request to the host shouldn't be sent."""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+            if self.clock() - opened_at < self.reset_after or host in self._trial:
+                METRICS.inc('fetch_circuit_rejected_total')
+                msg = f'Circuit open for `{host}` after {self._failures[host]} failures'
+                raise CircuitOpenError(msg)
+            self._trial.add(host)
+
+    def record(self, host: str, *, success: bool) -> None:
+        """Record the outcome of the request to the host."""
+        with self._lock:
+            self._trial.discard(host)
+            if success:
+                self._failures.pop(host, None)
+                self._opened_at.pop(host, None)
+                return
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if host in self._opened_at or self._failures[host] >= self.failure_threshold:
+                if host not in self._opened_at:
+                    logging.warning(f'Opening circuit for `{host}` after repeated failures')
+                self._opened_at[host] = self.clock()
+
+
+class FetchPolicy:
+    """Content getter wrapper adding retries, hedged requests and circuit breaker.
+
+    Server errors (5xx, 429) and connection errors, including timeouts
+    and malformed responses, are retried with jittered exponential
+    backoff. Other HTTP errors, and pages exceeding the size limit of the
+    client, are not. Errors which remain after the retries are raised, so
+    `fetch_all` reports and skips the page.
+
+    With hedging enabled, if a request doesn't complete within the 95th
+    percentile of recent latencies, a duplicate request is sent, and the
+    first successful response wins. This trims the tail latency caused
+    by a few stalled requests.
+
+    Args:
+    ----
+        content_getter: Function used to fetch a single URL, e.g.
+                        `HttpClient.get_content` with its timeouts.
+        retries: How many times a failed request is retried.
+        backoff: The base delay in seconds of the exponential backoff.
+        hedge: Whether to send hedged requests.
+        hedge_after: Fixed delay in seconds after which hedged request is
+                     sent. The 95th percentile of recent latencies if `None`.
+        breaker: The circuit breaker, one with default settings if `None`.
+        sleep: Function sleeping for the given number of seconds.
+
+    """
+
+    # Latencies used to estimate the 95th percentile
+    _WINDOW = 200
+    _MIN_SAMPLES = 20
+
+    def __init__(
+        self,
+        content_getter: Callable[[str], bytes],
+        retries: int = 2,
+        backoff: float = 0.5,
+        *,
+        hedge: bool = False,
+        hedge_after: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        sleep: Callable[[float], object] = time.sleep,
+    ) -> None:
+        self.content_getter = content_getter
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+        self._latencies: deque[float] = deque(maxlen=self._WINDOW)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(thread_name_prefix='hedged') if hedge else None
+
+    def get_content(self, url: str) -> bytes:
+        """Return the body of the provided URL. Can be used as `content_getter`."""
+        host = urllib.parse.urlsplit(url).netloc
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_request(host)
+            try:
+                content = self._attempt(url)
+            except (OSError, http.client.HTTPException) as err:
+                retryable = _is_retryable(err)
+                # Client errors mean the host itself is responsive
+                self.breaker.record(host, success=not retryable)
+                if not retryable or attempt > self.retries:
+                    raise
+                METRICS.inc('fetch_retries_total')
+                delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                logging.info(f'Retrying `{url}` in {delay:.2f}s after error: `{err}`')
+                self.sleep(delay)
+            except BaseException:
+                # Any other error still has to release the trial request
+                # of the half-open circuit, or it would stay open forever
+                self.breaker.record(host, success=False)
+                raise
+            else:
+                self.breaker.record(host, success=True)
+                return content
+
+    def _attempt(self, url: str) -> bytes:
+        threshold = self._hedge_threshold()
+        if self._executor is None or threshold is None:
+            return self._timed(url)
+
+        primary = self._executor.submit(self._timed, url)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        METRICS.inc('fetch_hedged_total')
+        logging.debug(f'Sending hedged request for `{url}` after {threshold:.2f}s')
+        pending: set[Future[bytes]] = {primary, self._executor.submit(self._timed, url)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The request which lost is left to time out, unless
+                    # it's still waiting for a free thread
+                    for loser in pending:
+                        loser.cancel()
+                    return future.result()
+            if not pending:
+                return done.pop().result()
+
+    def close(self) -> None:
+        """Stop the threads sending hedged requests, without waiting for stalled ones."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _timed(self, url: str) -> bytes:
+        start = time.perf_counter()
+        content = self.content_getter(url)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return content
+
+    def _hedge_threshold(self) -> float | None:
+        if not self.hedge:
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self._lock:
+            if len(self._latencies) < self._MIN_SAMPLES:
+                return None
+            return statistics.quantiles(self._latencies, n=20)[-1]
+
+
+def _is_retryable(err: OSError | http.client.HTTPException) -> bool:
+    if isinstance(err, urllib.error.HTTPError):
+        return err.code >= 500 or err.code == 429
+    return not isinstance(err, PageTooLargeError)
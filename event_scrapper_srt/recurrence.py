@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from event_scrapper_srt.event import Occurrence
+
+
+@dataclass(frozen=True)
+class Run:
+    """Occurrences repeating regularly, as a recurrent event in Gancio.
+
+    Args:
+    ----
+        occurrences: The occurrences of the run, from the earliest.
+        frequency: `1w` for weekly, `2w` for bi-weekly, and `1m` for
+                   monthly runs, as in Gancio.
+        ordinal: For monthly runs, which weekday of the month the run
+                 takes place on, e.g. 2 for the second Sunday of the month.
+
+    """
+
+    occurrences: list[Occurrence]
+    frequency: str
+    ordinal: int | None = None
+
+    def recurrent(self) -> dict[str, object]:
+        """Return the `recurrent` field of the Gancio event."""
+        if self.ordinal is None:
+            return {'frequency': self.frequency}
+        return {'frequency': self.frequency, 'type': self.ordinal}
+
+    def open_ended(self, horizon: datetime) -> bool:
+        """Whether the run may continue after its last listed occurrence.
+
+        `horizon` is the latest time the source lists occurrences until.
+        If the next occurrence of the run would start before it, the
+        source would have listed it, so the run has ended.
+        """
+        following = _STEPS[self.frequency](self.occurrences[-1].start)
+        return following is not None and following > horizon
+
+
+def series_key(start: datetime, recurrent: dict[str, object]) -> str:
+    """Return the key of the recurrent series, the same for all its occurrences.
+
+    The key consists of the frequency, the weekday and the wall clock
+    start time, e.g. `1w/7/20:00` for every Sunday at 20:00, so it
+    doesn't change when the earliest occurrence passes.
+    """
+    parts = [str(recurrent['frequency'])]
+    if recurrent.get('type') is not None:
+        parts.append(str(recurrent['type']))
+    parts.extend([str(start.isoweekday()), f'{start:%H:%M}'])
+    return '/'.join(parts)
+
+
+def detect_runs(
+    occurrences: list[Occurrence], min_length: int = 3
+) -> tuple[list[Run], list[Occurrence]]:
+    """Split occurrences into regular runs and the remaining irregular dates.
+
+    A run has occurrences starting on the same weekday at the same time,
+    lasting the same time, and spaced by one week, two weeks, or one month
+    (the same weekday of the month, e.g. the second Sunday). Occurrences
+    of a run don't have to be consecutive, so an extra date in between
+    doesn't break it. The longest run starting at each occurrence wins.
+
+    Args:
+    ----
+        occurrences: The occurrences of the event.
+        min_length: The minimum number of occurrences in a run, shorter
+                    runs are left as irregular dates.
+
+    Returns:
+    -------
+        Runs ordered by their first occurrence, and the irregular
+        occurrences in the original order.
+
+    """
+    by_start = {dt.start: dt for dt in occurrences}
+    used: set[datetime] = set()
+    runs = []
+    for first in sorted(occurrences, key=lambda dt: dt.start):
+        if first.start in used:
+            continue
+        best: Run | None = None
+        for frequency, step in _STEPS.items():
+            run = [first]
+            while (start := step(run[-1].start)) in by_start and start not in used:
+                candidate = by_start[start]
+                if _duration(candidate) != _duration(first):
+                    break
+                run.append(candidate)
+            if len(run) >= min_length and (best is None or len(run) > len(best.occurrences)):
+                ordinal = _ordinal(first.start) if frequency == '1m' else None
+                best = Run(occurrences=run, frequency=frequency, ordinal=ordinal)
+        if best is not None:
+            runs.append(best)
+            used.update(dt.start for dt in best.occurrences)
+    irregular = [dt for dt in occurrences if dt.start not in used]
+    return runs, irregular
+
+
+def _duration(occurrence: Occurrence) -> timedelta | None:
+    return occurrence.end - occurrence.start if occurrence.end else None
+
+
+def _ordinal(dt: datetime) -> int:
+    return (dt.day - 1) // 7 + 1
+
+
+def _next_month(dt: datetime) -> datetime | None:
+    # The same weekday of the month, at the same wall clock time
+    year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+    first = dt.replace(year=year, month=month, day=1)
+    day = 1 + (dt.weekday() - first.weekday()) % 7 + (_ordinal(dt) - 1) * 7
+    try:
+        return first.replace(day=day)
+    except ValueError:
+        # There is no fifth such weekday in the month
+        return None
+
+
+# Adding timedelta to timezone-aware datetime keeps the wall clock time,
+# so runs keep going across DST changes
+_STEPS: dict[str, Callable[[datetime], datetime | None]] = {
+    '1w': lambda dt: dt + timedelta(weeks=1),
+    '2w': lambda dt: dt + timedelta(weeks=2),
+    '1m': _next_month,
+}
@@ -1,19 +1,34 @@
 from __future__ import annotations
 
+import functools
 import logging
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
 from datetime import datetime
 from datetime import time
+from time import perf_counter
 from typing import TYPE_CHECKING
 from zoneinfo import ZoneInfo
 
+import lxml.html
 from bs4 import BeautifulSoup
+from lxml import etree
 
 from event_scrapper_srt import util
 from event_scrapper_srt.event import Event
 from event_scrapper_srt.event import Occurrence
+from event_scrapper_srt.metrics import METRICS
+from event_scrapper_srt.state import StateEntry
 
 if TYPE_CHECKING:
     from collections.abc import Callable
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from concurrent.futures import Future
+
+    from event_scrapper_srt.sitemap import SitemapElem
 
 
 class _Header:
@@ -27,44 +42,200 @@ class _Header:
 class NotFoundError(Exception):
     """Error raised if information is not found in provided HTML."""
 
-    def __init__(self, name: str, soup: BeautifulSoup):
+    def __init__(self, name: str, soup: object):
         msg = f'{name} details not found in the provided HTML content: `{soup}`'
         super().__init__(msg)
 
 
 def get_events(
-    urls: list[str], content_getter: Callable[[str], bytes] = util.get_url_content
+    urls: Iterable[str],
+    content_getter: Callable[[str], bytes] = util.get_url_content,
+    concurrency: int = 1,
+    engine: str = 'bs4',
+    parse_workers: int = 0,
+    after: datetime | None = None,
 ) -> list[Event]:
-    events = []
-    for url in urls:
-        html_content = content_getter(url).decode()
-        events.append(_extract_event_details(html_content, url))
-    logging.info(f'Extracted details for {len(events)} events')
-    return events
+    """Extract event details from the provided event URLs.
 
+    See `iter_events` for the description of the arguments.
+    """
+    return list(
+        iter_events(
+            urls,
+            content_getter=content_getter,
+            concurrency=concurrency,
+            engine=engine,
+            parse_workers=parse_workers,
+            after=after,
+        )
+    )
 
-def _extract_event_details(html_content: str, url: str) -> Event:
-    soup = BeautifulSoup(html_content, 'html.parser')
 
-    title = _get_title(soup)
-    image_url = _get_image_url(soup)
-    place_name, place_address = _get_place_name_address(soup)
+def iter_events(
+    urls: Iterable[str],
+    content_getter: Callable[[str], bytes] = util.get_url_content,
+    concurrency: int = 1,
+    engine: str = 'bs4',
+    parse_workers: int = 0,
+    after: datetime | None = None,
+) -> Iterator[Event]:
+    """Yield event details from the provided event URLs as soon as each page is done.
 
-    try:
-        date_times = _get_date_times(soup)
-    except NotFoundError:
-        date_times = []
-        logging.info(f'[{title}] No date and time information found')
+    With `concurrency` greater than 1, pages are downloaded in a pool of
+    threads. Events are yielded in the same order as `urls`, and pages
+    which failed to download are skipped.
 
-    return Event(
-        url=url,
-        title=title,
-        description=_get_description(soup),
-        place_name=place_name,
-        place_address=place_address,
-        image_url=image_url,
-        date_times=date_times,
+    `engine` selects the HTML extraction engine, one of `ENGINES`.
+
+    With `parse_workers` greater than 0, pages are parsed in a pool of
+    processes, so parsing can use more than one core. Each page is handed
+    to the pool as soon as it's downloaded, so downloads continue while
+    earlier pages are being parsed.
+
+    With `after`, the `Kiedy?` section is parsed first, and pages with no
+    occurrence starting at or after it are skipped without extracting
+    the rest of the details. Such pages wouldn't produce any Gancio
+    event when `after` is the reference time of `gancio.prepare_event`.
+    """
+    pages = (
+        (url, content)
+        for url, content in util.fetch_all(urls, content_getter, concurrency=concurrency)
+        if content is not None
     )
+    results: Iterator[tuple[Event | None, float]]
+    if parse_workers > 0:
+        results = _extract_in_pool(pages, engine, after, parse_workers)
+    else:
+        results = (_extract_page(content, url, engine, after) for url, content in pages)
+    count = skipped = 0
+    for event, duration in results:
+        METRICS.observe('page_parse_seconds', duration)
+        if event is None:
+            skipped += 1
+            continue
+        count += 1
+        yield event
+    if skipped:
+        METRICS.inc('past_pages_skipped_total', skipped)
+        logging.info(f'Skipped {skipped} pages with no future occurrences')
+    logging.info(f'Extracted details for {count} events')
+
+
+def get_events_incremental(
+    elements: list[SitemapElem],
+    state: dict[str, StateEntry],
+    content_getter: Callable[[str], bytes] = util.get_url_content,
+    concurrency: int = 1,
+    engine: str = 'bs4',
+    parse_workers: int = 0,
+) -> tuple[list[Event], dict[str, StateEntry]]:
+    """Extract event details, scrapping only pages changed since the previous run.
+
+    Pages whose sitemap lastmod is the same as the one stored in `state`
+    reuse the stored event. If a changed page fails to download, its
+    previously stored event is reused, so it's retried in the next run.
+
+    Returns events in the same order as `elements`, and the new state
+    containing only the entries present in the sitemap.
+    """
+    changed = [
+        elem.url
+        for elem in elements
+        if elem.url not in state or state[elem.url].lastmod != elem.lastmod
+    ]
+    scrapped = {
+        event.url: event
+        for event in get_events(
+            changed,
+            content_getter=content_getter,
+            concurrency=concurrency,
+            engine=engine,
+            parse_workers=parse_workers,
+        )
+    }
+
+    events = []
+    new_state = {}
+    for elem in elements:
+        if elem.url in scrapped:
+            new_state[elem.url] = StateEntry(lastmod=elem.lastmod, event=scrapped[elem.url])
+        elif elem.url in state:
+            new_state[elem.url] = state[elem.url]
+        else:
+            continue
+        events.append(new_state[elem.url].event)
+    logging.info(
+        f'Reused {len(elements) - len(changed)} unchanged events, scrapped {len(scrapped)}'
+    )
+    return events, new_state
+
+
+def _extract_in_pool(
+    pages: Iterable[tuple[str, bytes]], engine: str, after: datetime | None, workers: int
+) -> Iterator[tuple[Event | None, float]]:
+    # Only a limited number of pages waits for a worker, so pages aren't
+    # downloaded faster than they are parsed, and memory usage stays flat
+    window = max(workers, 1) * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures: deque[Future[tuple[Event | None, float]]] = deque()
+        for url, content in pages:
+            futures.append(executor.submit(_extract_page, content, url, engine, after))
+            while futures and (len(futures) >= window or futures[0].done()):
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+def _extract_page(
+    content: bytes, url: str, engine: str, after: datetime | None = None
+) -> tuple[Event | None, float]:
+    # Duration is returned rather than recorded here, as this may run in
+    # a worker process
+    start = perf_counter()
+    event = ENGINES[engine](content, url, after)
+    return event, perf_counter() - start
+
+
+def _extract_event_details(
+    html_content: bytes, url: str, after: datetime | None = None
+) -> Event | None:
+    if after is not None and (section := _date_times_section(html_content)) is not None:
+        fragment = BeautifulSoup(section.decode(), 'html.parser')
+        if not _starts_after(_extract_date_times(fragment.find_all('p')), after):
+            logging.info(f'[{url}] No future occurrences found, skipping the rest of the page')
+            return None
+
+    soup = BeautifulSoup(html_content.decode(), 'html.parser')
+    try:
+        try:
+            date_times = _get_date_times(soup)
+        except NotFoundError:
+            date_times = None
+        if after is not None and not _starts_after(date_times or [], after):
+            logging.info(f'[{url}] No future occurrences found, skipping the rest of the page')
+            return None
+
+        title = _get_title(soup)
+        image_url = _get_image_url(soup)
+        place_name, place_address = _get_place_name_address(soup)
+
+        if date_times is None:
+            date_times = []
+            logging.info(f'[{title}] No date and time information found')
+
+        return Event(
+            url=url,
+            title=title,
+            description=_get_description(soup),
+            place_name=place_name,
+            place_address=place_address,
+            image_url=image_url,
+            date_times=date_times,
+        )
+    finally:
+        # Nodes of the tree reference each other, so without this the tree
+        # stays in memory until the cyclic garbage collector runs
+        soup.decompose()
 
 
 def _get_title(soup: BeautifulSoup) -> str:
@@ -108,13 +279,190 @@ def _get_date_times(soup: BeautifulSoup) -> list[Occurrence]:
 
 
 def _extract_date_times(p_elems: list[BeautifulSoup]) -> list[Occurrence]:
+    return _parse_occurrences(
+        (strong.text, dt.text, dt) for dt in p_elems if (strong := dt.find('strong'))
+    )
+
+
+_TZ = ZoneInfo('Europe/Warsaw')
+
+# DD MONTH YYYY HH:MM, optionally followed by - HH:MM
+_OCCURRENCE_RE = re.compile(
+    r'(?P<date>(?P<day>\d{1,2})\s+(?P<month>\w+)\s+(?P<year>\d{4}))\s+'
+    r'(?P<start_hour>\d{1,2}):(?P<start_minute>\d{2})'
+    r'(?:\s*-\s*(?P<end_hour>\d{1,2}):(?P<end_minute>\d{2}))?\s*$'
+)
+
+
+def _starts_after(date_times: list[Occurrence], after: datetime) -> bool:
+    return any(dt.start >= after for dt in date_times)
+
+
+_DATE_TIMES_HEADER_RE = re.compile(
+    rb'<h5\b[^>]*>[^<]*' + re.escape(_Header.DATE_TIMES.encode()) + rb'[^<]*</h5>'
+)
+_DESCRIPTION_HEADER_RE = re.compile(
+    rb'<h4\b[^>]*>[^<]*' + re.escape(_Header.DESCRIPTION.encode()) + rb'[^<]*</h4>'
+)
+_DIV_TAG_RE = re.compile(rb'<(/?)div\b', re.IGNORECASE)
+_P_TAG_RE = re.compile(rb'<(/?)p\b', re.IGNORECASE)
+# Start tags on which lxml closes an open paragraph, while html.parser used
+# by BeautifulSoup keeps nesting them in it
+_P_CLOSING_TAG_RE = re.compile(
+    rb'<(p|div|ul|ol|dl|dd|dt|li|table|h[1-6]|pre|listing|xmp|blockquote|form|hr|address'
+    rb'|fieldset|menu|dir|center|section|article|aside|header|footer|nav|main|figure'
+    rb'|figcaption|details|summary)\b',
+    re.IGNORECASE,
+)
+
+
+def _date_times_section(html_content: bytes) -> bytes | None:
+    """Return the raw HTML of the `Kiedy?` section, without parsing the page.
+
+    The section is the `<div>` containing the header, which holds the
+    same paragraphs the engines find in the parsed page. Lets `after` skip
+    past events before the expensive parsing of the whole page. `None` if
+    the section isn't found this way.
+    """
+    header = _DATE_TIMES_HEADER_RE.search(html_content)
+    if header is None:
+        return None
+    return _enclosing_div(html_content, header.start(), header.end())
+
+
+class _Layout:
+    """How lxml parses the description paragraph, compared with html.parser."""
+
+    # The paragraph has the same contents
+    SAME = 'same'
+    # The paragraph only wraps other paragraphs, and lxml closes it on the
+    # first of them, so the contents are its following siblings
+    WRAPPER = 'wrapper'
+    # The contents differ, e.g. lxml closes the paragraph on a list
+    OTHER = 'other'
+
+
+def _description_section(html_content: bytes) -> tuple[bytes, str] | None:
+    """Return the raw HTML of the description section, without parsing the page.
+
+    The section is the `<div>` containing the first description header
+    followed by a paragraph, like in `_get_description`. Also returns
+    the `_Layout` of the paragraph. `None` if the section isn't found
+    this way.
+    """
+    for header in _DESCRIPTION_HEADER_RE.finditer(html_content):
+        section = _enclosing_div(html_content, header.start(), header.end())
+        if section is None:
+            return None
+        tags = _P_TAG_RE.finditer(section)
+        start = next((tag for tag in tags if not tag[1]), None)
+        if start is None:
+            continue
+        # The paragraph ends with the matching end tag, or with the section
+        depth, end = 1, len(section)
+        nested = False
+        for tag in tags:
+            depth += -1 if tag[1] else 1
+            nested = nested or depth > 2
+            if not depth:
+                end = tag.start()
+                break
+        return section, _layout(section, start.end(), end, nested=nested)
+    return None
+
+
+def _layout(section: bytes, start: int, end: int, *, nested: bool) -> str:
+    closing = list(_P_CLOSING_TAG_RE.finditer(section, start, end))
+    if not closing:
+        return _Layout.SAME
+    content_start = section.index(b'>', start) + 1
+    rest = section[section.find(b'>', end) + 1 :].removesuffix(b'</div>')
+    if (
+        not nested
+        and end < len(section)
+        and all(tag[1].lower() == b'p' for tag in closing)
+        and not section[content_start : closing[0].start()].strip()
+        and not rest.strip()
+    ):
+        return _Layout.WRAPPER
+    return _Layout.OTHER
+
+
+def _enclosing_div(html_content: bytes, start: int, end: int) -> bytes | None:
+    """Return the raw HTML of the innermost `<div>` enclosing the range."""
+    depth = 0
+    for tag in reversed(list(_DIV_TAG_RE.finditer(html_content, 0, start))):
+        if tag[1]:
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:
+            section_start = tag.start()
+            break
+    else:
+        return None
+    depth = 0
+    for tag in _DIV_TAG_RE.finditer(html_content, end):
+        if not tag[1]:
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:
+            return html_content[section_start : html_content.find(b'>', tag.end()) + 1]
+    return None
+
+
+def _parse_occurrences(paragraphs: Iterable[tuple[str, str, object]]) -> list[Occurrence]:
+    """Parse all the occurrences listed in the `Kiedy?` section.
+
+    Each paragraph is given as a tuple of the date string (the content of
+    `<strong>`), the full text of the paragraph, and the paragraph element
+    itself, used only in the logs. See `_extract_date_time` for the format.
+
+    Paragraphs are matched with a single pre-compiled regex, and parsed
+    dates are memoized, as recurring events repeat the same dates over and
+    over. Paragraphs not matching the regex fall back to the slower, more
+    lenient `_parse_date_time`.
+    """
     date_times = []
-    for dt in p_elems:
-        if dt.find('strong'):
-            date_times.append(_extract_date_time(dt, tzinfo=ZoneInfo('Europe/Warsaw')))
+    for date_str, text, source in paragraphs:
+        match = _OCCURRENCE_RE.search(text)
+        if match is None or match['date'] != ' '.join(date_str.split()):
+            date_times.append(_parse_date_time(date_str, text, _TZ, source))
+            continue
+        parts = _parse_date_parts(match['day'], match['month'], match['year'])
+        if parts is None:
+            date_times.append(_parse_date_time(date_str, text, _TZ, source))
+            continue
+        start_dt = datetime(
+            *parts, int(match['start_hour']), int(match['start_minute']), tzinfo=_TZ
+        )
+        if match['end_hour'] is None:
+            logging.warning(
+                f'No end time found for the date `{_describe(source)}`, setting to None'
+            )
+            end_dt = None
+        else:
+            end_dt = datetime(*parts, int(match['end_hour']), int(match['end_minute']), tzinfo=_TZ)
+        date_times.append(Occurrence(start=start_dt, end=end_dt))
     return date_times
 
 
+@functools.lru_cache(maxsize=1024)
+def _parse_date_parts(day: str, month: str, year: str) -> tuple[int, int, int] | None:
+    if (month_num := _MONTHS_PL.get(month)) is None:
+        return None
+    # Validates the date, e.g. 31 February
+    date(int(year), month_num, int(day))
+    return int(year), month_num, int(day)
+
+
+def _describe(source: object) -> str:
+    if isinstance(source, lxml.html.HtmlElement):
+        return _to_html(source)
+    return str(source)
+
+
 def _extract_date_time(soup: BeautifulSoup, tzinfo: ZoneInfo) -> Occurrence:
     """Extract date and start and end time from the provided string.
 
@@ -140,16 +488,23 @@ def _extract_date_time(soup: BeautifulSoup, tzinfo: ZoneInfo) -> Occurrence:
         i.e.
         27 lipca 2024 12:00 - 15:00
     """
-    date_str = soup.find('strong').text.strip()
-    date = _parse_polish_date(date_str)
+    return _parse_date_time(soup.find('strong').text, soup.text, tzinfo, source=soup)
+
+
+def _parse_date_time(date_str: str, text: str, tzinfo: ZoneInfo, source: object) -> Occurrence:
+    """Parse the occurrence from the date string and the full paragraph text.
+
+    `source` is the HTML element the strings come from, used in the logs.
+    """
+    date = _parse_polish_date(date_str.strip())
 
-    start_time = soup.text.partition('-')[0].split()[-1]
+    start_time = text.partition('-')[0].split()[-1]
     start_dt = datetime.combine(date, _get_time(start_time), tzinfo=tzinfo)
 
     try:
-        end_time = soup.text.partition('-')[-1].split()[-1]
+        end_time = text.partition('-')[-1].split()[-1]
     except IndexError:
-        logging.warning(f'No end time found for the date `{soup}`, setting to None')
+        logging.warning(f'No end time found for the date `{_describe(source)}`, setting to None')
         end_dt = None
     else:
         end_dt = datetime.combine(date, _get_time(end_time), tzinfo=tzinfo)
@@ -187,3 +542,206 @@ def _parse_polish_date(date_str: str) -> datetime:
 def _get_time(time_str: str) -> time:
     hour, _, minute = time_str.partition(':')
     return time(int(hour), int(minute))
+
+
+# lxml extraction engine
+#
+# Alternative to the BeautifulSoup based extraction above. The page is
+# parsed once with lxml, and all the headers are found in a single pass
+# of a pre-compiled XPath. It produces the same `Event` objects as the
+# BeautifulSoup engine, including the serialized HTML of the description.
+# lxml closes a paragraph on block elements, like lists, which html.parser
+# nests in it, so such a description is parsed with html.parser from its
+# section of the raw HTML. If the section can't be found there, the whole
+# page is extracted by the BeautifulSoup engine.
+
+_SECTIONS = etree.XPath('//h1 | //h4 | //h5 | //header')
+_FIRST_P = etree.XPath('(.//p)[1]')
+_FIRST_DIV = etree.XPath('(.//div)[1]')
+_ALL_P = etree.XPath('.//p')
+_FIRST_STRONG = etree.XPath('(.//strong)[1]')
+
+# Size of the chunks of the page fed to the lxml parser
+_FEED_SIZE = 2**16
+
+# Elements serialized by BeautifulSoup as `<tag/>`
+_VOID_ELEMENTS = frozenset(
+    {
+        'area',
+        'base',
+        'br',
+        'col',
+        'embed',
+        'hr',
+        'img',
+        'input',
+        'keygen',
+        'link',
+        'menuitem',
+        'meta',
+        'param',
+        'source',
+        'track',
+        'wbr',
+        'basefont',
+        'bgsound',
+        'command',
+        'frame',
+        'image',
+        'isindex',
+        'nextid',
+        'spacer',
+    }
+)
+
+
+def _extract_event_details_lxml(
+    html_content: bytes, url: str, after: datetime | None = None
+) -> Event | None:
+    if after is not None and (section := _date_times_section(html_content)) is not None:
+        fragment = lxml.html.fragment_fromstring(section.decode(), create_parent='div')
+        if not _starts_after(_get_date_times_lxml(fragment), after):
+            logging.info(f'[{url}] No future occurrences found, skipping the rest of the page')
+            return None
+
+    root = _parse_lxml(html_content)
+
+    title = image_url = None
+    place_section = date_times_section = None
+    description_sections = []
+    for elem in _SECTIONS(root):
+        if elem.tag == 'h1':
+            if title is None:
+                title = elem.text_content().strip()
+        elif elem.tag == 'h4':
+            if _Header.DESCRIPTION in elem.text_content():
+                description_sections.append(elem.getparent())
+        elif elem.tag == 'h5':
+            text = elem.text_content()
+            if not place_section and _Header.PLACE in text:
+                place_section = _FIRST_P(elem.getparent())
+            elif date_times_section is None and _Header.DATE_TIMES in text:
+                date_times_section = elem.getparent()
+        elif image_url is None and (div := _FIRST_DIV(elem)):
+            image_url = div[0].attrib['data-bg'].partition('(')[-1].partition(')')[0]
+
+    date_times = None
+    if date_times_section is not None:
+        date_times = _get_date_times_lxml(date_times_section)
+    if after is not None and not _starts_after(date_times or [], after):
+        logging.info(f'[{url}] No future occurrences found, skipping the rest of the page')
+        return None
+
+    if title is None:
+        raise NotFoundError('Title', _to_html(root))
+    if image_url is None:
+        logging.warning(f'Failed to extract image url from HTML content: `{_to_html(root)}`')
+    if not place_section:
+        raise NotFoundError('Place', _to_html(root))
+    place_name_raw, _, place_address_raw = (
+        place_section[0].text_content().lstrip('`').strip().partition(',')
+    )
+    # Descriptions are serialized only now, as it's the most expensive part
+    description = None
+    paragraph = next((p[0] for section in description_sections if (p := _FIRST_P(section))), None)
+    if paragraph is not None:
+        if (raw := _description_section(html_content)) is None:
+            # It's not known whether lxml parsed the description like
+            # html.parser, so the page is extracted by the other engine
+            return _extract_event_details(html_content, url, after)
+        section, layout = raw
+        if layout == _Layout.SAME:
+            description = _get_description_lxml(paragraph.text, paragraph)
+        elif layout == _Layout.WRAPPER:
+            description = _get_description_lxml(None, paragraph.itersiblings())
+        else:
+            description = _get_description(BeautifulSoup(section.decode(), 'html.parser'))
+    if description is None:
+        logging.warning(f'Description not found in the provided HTML content: `{_to_html(root)}`')
+
+    if date_times is None:
+        date_times = []
+        logging.info(f'[{title}] No date and time information found')
+
+    return Event(
+        url=url,
+        title=title,
+        description=description or '',
+        place_name=place_name_raw.strip(),
+        place_address=place_address_raw.strip(),
+        image_url=image_url,
+        date_times=date_times,
+    )
+
+
+def _parse_lxml(html_content: bytes) -> etree._Element:
+    """Parse the page feeding it in chunks, so it's never decoded as a whole."""
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    for start in range(0, len(html_content), _FEED_SIZE):
+        parser.feed(html_content[start : start + _FEED_SIZE])
+    return parser.close()
+
+
+def _get_date_times_lxml(section: etree._Element) -> list[Occurrence]:
+    return _parse_occurrences(
+        (strong[0].text_content(), p.text_content(), p)
+        for p in _ALL_P(section)
+        if (strong := _FIRST_STRONG(p))
+    )
+
+
+def _get_description_lxml(text: str | None, elems: Iterable[etree._Element]) -> str:
+    contents = _serialize_text(text) + ''.join(_serialize(elem) for elem in elems)
+    return ' '.join(contents.strip().replace('\n', '').split())
+
+
+def _serialize_contents(elem: etree._Element) -> str:
+    """Serialize the contents of the element the same way as BeautifulSoup."""
+    parts = [_serialize_text(elem.text)]
+    parts.extend(_serialize(child) for child in elem)
+    return ''.join(parts)
+
+
+def _serialize(elem: etree._Element) -> str:
+    """Serialize the element and its tail the same way as BeautifulSoup."""
+    tail = _serialize_text(elem.tail)
+    if not isinstance(elem.tag, str):
+        if elem.tag is etree.Comment:
+            return f'<!--{elem.text}-->{tail}'
+        return tail
+    attrs = ''.join(f' {key}={_quote_attribute(value)}' for key, value in elem.attrib.items())
+    if elem.tag in _VOID_ELEMENTS:
+        return f'<{elem.tag}{attrs}/>{tail}'
+    return f'<{elem.tag}{attrs}>{_serialize_contents(elem)}</{elem.tag}>{tail}'
+
+
+def _serialize_text(text: str | None) -> str:
+    if not text:
+        return ''
+    if not text.strip(' \t\n\r\f'):
+        # BeautifulSoup collapses whitespace-only strings
+        return '\n' if '\n' in text else ' '
+    return _escape(text)
+
+
+def _escape(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _quote_attribute(value: str) -> str:
+    value = _escape(value)
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return '"{}"'.format(value.replace('"', '&quot;'))
+
+
+def _to_html(elem: etree._Element) -> str:
+    return lxml.html.tostring(elem, encoding='unicode', with_tail=False)
+
+
+ENGINES: dict[str, Callable[[bytes, str, datetime | None], Event | None]] = {
+    'bs4': _extract_event_details,
+    'lxml': _extract_event_details_lxml,
+}
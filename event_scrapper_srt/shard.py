@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse shard given as `I/N`, where `1 <= I <= N`. Return `(I, N)`."""
+    index, sep, count = value.partition('/')
+    if not sep or not index.isdigit() or not count.isdigit():
+        msg = f'expected shard as I/N, got `{value}`'
+        raise ValueError(msg)
+    if not 1 <= int(index) <= int(count):
+        msg = f'expected 1 <= I <= N, got `{value}`'
+        raise ValueError(msg)
+    return int(index), int(count)
+
+
+def in_shard(url: str, index: int, count: int) -> bool:
+    """Return whether the URL is scrapped by the shard `index` of `count`.
+
+    Assignment depends only on the URL, so shards running on different
+    machines scrap disjoint subsets of the sitemap without coordination.
+    """
+    digest = hashlib.sha1(url.encode(), usedforsecurity=False).digest()
+    return int.from_bytes(digest[:8], 'big') % count == index - 1
+
+
+def merge(outputs: Iterable[Iterable[str]], urls: list[str]) -> Iterator[str]:
+    """Merge NDJSON outputs of the shards into the order of a single-process run.
+
+    Lines are ordered by the position of their event URL in `urls`, the
+    order in which a single process scraps them, keeping the order of
+    lines of the same URL. Lines of URLs missing from `urls`, e.g. removed
+    from the sitemap since the shards ran, come last. Lines are yielded
+    unchanged, so both output formats are supported.
+
+    Args:
+    ----
+        outputs: Lines written by each of the shards.
+        urls: Event URLs in the order of the sitemap.
+
+    """
+    lines_by_url: dict[str, list[str]] = {}
+    for output in outputs:
+        for line in output:
+            if line.strip():
+                url = json.loads(line)['online_locations'][0]
+                lines_by_url.setdefault(url, []).append(line.rstrip('\n') + '\n')
+    for url in urls:
+        yield from lines_by_url.pop(url, [])
+    for lines in lines_by_url.values():
+        yield from lines
@@ -1,23 +1,99 @@
 from __future__ import annotations
 
+import io
 import logging
-from collections.abc import Callable
-from collections.abc import Sequence
+from collections import Counter
 from dataclasses import dataclass
 from datetime import datetime
 from datetime import timezone
+from typing import TYPE_CHECKING
 
 from lxml import etree
 
 from event_scrapper_srt import util
+from event_scrapper_srt.metrics import METRICS
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Iterator
 
 
 def get_urls(
-    sitemap_url: str, content_getter: Callable[[str], bytes] = util.get_url_content
+    sitemap_url: str,
+    content_getter: Callable[[str], bytes] = util.get_url_content,
+    now: datetime | None = None,
+    concurrency: int = 4,
 ) -> list[str]:
     """Extract event URLs from the provided sitemap URL."""
-    xml_content = content_getter(sitemap_url)
-    return [sm.url for sm in get_elements(xml_content)]
+    elements = fetch_elements(sitemap_url, content_getter, concurrency=concurrency, now=now)
+    return [sm.url for sm in elements]
+
+
+def fetch_elements(
+    sitemap_url: str,
+    content_getter: Callable[[str], bytes] = util.get_url_content,
+    max_age_days: int = 30,
+    concurrency: int = 4,
+    now: datetime | None = None,
+) -> list[SitemapElem]:
+    """Extract event URLs and lastmod dates from the provided sitemap URL.
+
+    If the URL points to a sitemap index, up to `concurrency` child
+    sitemaps are fetched at the same time, and their entries are combined
+    in the order of the index. Child sitemaps with lastmod older than
+    `max_age_days` are not fetched at all, those without lastmod are
+    always fetched. Nested sitemap indexes are followed in place, each
+    sitemap is fetched at most once.
+
+    The age is counted from `now`, current time if not provided, e.g.
+    archived sitemaps are filtered as of the time they were fetched.
+    """
+    with METRICS.timer('sitemap_fetch_seconds'):
+        xml_content = content_getter(sitemap_url)
+    METRICS.inc('sitemap_fetch_bytes_total', len(xml_content))
+    if not _is_sitemap_index(xml_content):
+        with METRICS.timer('sitemap_parse_seconds'):
+            return get_elements(xml_content, max_age_days, now)
+
+    now = now or datetime.now(timezone.utc)
+    events = _index_elements(
+        xml_content, content_getter, max_age_days, concurrency, now, seen={sitemap_url}
+    )
+    # Child sitemaps display the events from the oldest to the newest
+    events.reverse()
+    logging.info(f'Extracted {len(events)} events from the sitemap index')
+    return events
+
+
+def _index_elements(
+    xml_content: bytes,
+    content_getter: Callable[[str], bytes],
+    max_age_days: int,
+    concurrency: int,
+    now: datetime,
+    seen: set[str],
+) -> list[SitemapElem]:
+    child_urls = []
+    for sm in _iter_entries(xml_content, 'sitemap', max_age_days, now, require_lastmod=False):
+        if sm.url not in seen:
+            seen.add(sm.url)
+            child_urls.append(sm.url)
+    logging.info(f'Found {len(child_urls)} recent sitemaps in the sitemap index')
+    events: list[SitemapElem] = []
+    fetched = util.fetch_all(
+        child_urls, content_getter, concurrency=concurrency, metric='sitemap_fetch'
+    )
+    for url, content in fetched:
+        if content is None:
+            continue
+        if _is_sitemap_index(content):
+            logging.info(f'Following nested sitemap index `{url}`')
+            events.extend(
+                _index_elements(content, content_getter, max_age_days, concurrency, now, seen)
+            )
+        else:
+            events.extend(iter_elements(content, max_age_days, now))
+    return events
 
 
 @dataclass(frozen=True)
@@ -38,7 +114,9 @@ class SitemapElem:
     lastmod: str
 
 
-def get_elements(xml_content: bytes, max_age_days: int = 30) -> list[SitemapElem]:
+def get_elements(
+    xml_content: bytes, max_age_days: int = 30, now: datetime | None = None
+) -> list[SitemapElem]:
     """Extract event URLs and lastmod dates from the sitemap XML content.
 
     Sitemap displays the events from the oldest to the newest, so we
@@ -49,46 +127,81 @@ def get_elements(xml_content: bytes, max_age_days: int = 30) -> list[SitemapElem
         xml_content: The XML content of the sitemap.
         max_age_days: The maximum age of the event in days. Events older
         than this will be skipped.
+        now: The reference time for `max_age_days`. Current time if not
+             provided.
 
     """
-    root = etree.fromstring(xml_content)
+    stats: Counter[str] = Counter()
+    now = now or datetime.now(timezone.utc)
+    events = list(_iter_entries(xml_content, 'url', max_age_days, now, stats))
+    events.reverse()
+    logging.info(f'Found {stats["found"]} events in the sitemap')
+    logging.info(f'Extracted {len(events)} events from the sitemap')
+    return events
 
-    schema_location = root.attrib['{http://www.w3.org/2001/XMLSchema-instance}schemaLocation']
-    schema_parts = schema_location.split()
-    # Define the namespace dictionary for use in xpath
-    ns = {'ns': str(schema_parts[0])}
 
-    elements = root.xpath('//ns:url', namespaces=ns)
+def iter_elements(
+    xml_content: bytes, max_age_days: int = 30, now: datetime | None = None
+) -> Iterator[SitemapElem]:
+    """Yield event URLs and lastmod dates as they are read from the sitemap.
 
-    logging.info(f'Found {len(elements)} events in the sitemap')
-    events = []
+    Entries are yielded in the document order, i.e. from the oldest to
+    the newest. Already processed XML elements are freed, so memory usage
+    doesn't grow with the size of the sitemap.
+
+    Args:
+    ----
+        xml_content: The XML content of the sitemap.
+        max_age_days: The maximum age of the event in days. Events older
+        than this will be skipped.
+        now: The reference time for `max_age_days`. Current time if not
+             provided.
 
-    for elem in reversed(elements):
-        assert isinstance(elem, etree._Element)  # noqa: SLF001
-        url = _get_xpath_value(elem, 'ns:loc/text()', ns)
-        lastmod = _get_xpath_value(elem, 'ns:lastmod/text()', ns)
+    """
+    now = now or datetime.now(timezone.utc)
+    yield from _iter_entries(xml_content, 'url', max_age_days, now)
+
+
+def _is_sitemap_index(xml_content: bytes) -> bool:
+    for _, root in etree.iterparse(io.BytesIO(xml_content), events=('start',)):
+        return etree.QName(root).localname == 'sitemapindex'
+    return False
+
+
+def _iter_entries(
+    xml_content: bytes,
+    tag: str,
+    max_age_days: int,
+    now: datetime,
+    stats: Counter[str] | None = None,
+    *,
+    require_lastmod: bool = True,
+) -> Iterator[SitemapElem]:
+    for _, elem in etree.iterparse(io.BytesIO(xml_content), events=('end',), tag=f'{{*}}{tag}'):
+        url = elem.findtext('{*}loc', '').strip()
+        lastmod = elem.findtext('{*}lastmod', '').strip()
+        # Free the already processed part of the tree
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+        if stats is not None:
+            stats['found'] += 1
+
+        if not lastmod and not require_lastmod:
+            # Without lastmod there's no telling whether the entry is recent
+            yield SitemapElem(url=url, lastmod=lastmod)
+            continue
         try:
             lastmod_dt = datetime.fromisoformat(lastmod)
         except ValueError as err:
             logging.warning(f'Failed to parse lastmod date `{lastmod}`. Error: `{err}`')
-        else:
-            if _event_older_than(lastmod_dt, max_age_days):
-                logging.debug(f'Event `{url}` is older than {max_age_days} days, skipping')
-            else:
-                event = SitemapElem(url=url, lastmod=lastmod)
-                events.append(event)
-
-    logging.info(f'Extracted {len(events)} events from the sitemap')
-    return events
-
-
-def _get_xpath_value(elem: etree._Element, path: str, namespace: dict[str, str]) -> str:
-    all_ = elem.xpath(path, namespaces=namespace)
-    assert isinstance(all_, Sequence)
-    return str(all_[0])
+            continue
+        if _older_than(lastmod_dt, max_age_days, now):
+            logging.debug(f'`{url}` is older than {max_age_days} days, skipping')
+            continue
+        yield SitemapElem(url=url, lastmod=lastmod)
 
 
-def _event_older_than(dt: datetime, max_age_days: int) -> bool:
-    days = (dt - datetime.now(timezone.utc)).days * -1
-    logging.debug(f'Event is {days} days old')
+def _older_than(dt: datetime, max_age_days: int, now: datetime) -> bool:
+    days = (dt - now).days * -1
     return days > max_age_days
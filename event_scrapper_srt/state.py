@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from event_scrapper_srt.event import Event
+from event_scrapper_srt.event import Occurrence
+
+if TYPE_CHECKING:
+    import os
+
+
+@dataclass(frozen=True)
+class StateEntry:
+    """Event scrapped in the previous run, stored in the state file.
+
+    Args:
+    ----
+        lastmod: The sitemap lastmod date of the page when it was scrapped.
+        event: The event extracted from the page.
+
+    """
+
+    lastmod: str
+    event: Event
+
+
+def load_state(path: str | os.PathLike[str]) -> dict[str, StateEntry]:
+    """Load the state file. Return empty state if the file doesn't exist."""
+    try:
+        raw = json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        logging.info(f'State file `{path}` not found, starting from scratch')
+        return {}
+    return {
+        url: StateEntry(lastmod=entry['lastmod'], event=_event_from_dict(entry['event']))
+        for url, entry in raw.items()
+    }
+
+
+def save_state(path: str | os.PathLike[str], state: dict[str, StateEntry]) -> None:
+    """Save the state file, replacing it atomically."""
+    raw = {
+        url: {'lastmod': entry.lastmod, 'event': _event_to_dict(entry.event)}
+        for url, entry in state.items()
+    }
+    path = Path(path)
+    tmp_path = path.with_name(f'{path.name}.tmp')
+    tmp_path.write_text(json.dumps(raw, ensure_ascii=False))
+    tmp_path.replace(path)
+
+
+def _event_to_dict(event: Event) -> dict[str, Any]:
+    return {
+        'url': event.url,
+        'title': event.title,
+        'description': event.description,
+        'place_name': event.place_name,
+        'place_address': event.place_address,
+        'image_url': event.image_url,
+        'date_times': [
+            {'start': _datetime_to_dict(dt.start), 'end': dt.end and _datetime_to_dict(dt.end)}
+            for dt in event.date_times
+        ],
+    }
+
+
+def _event_from_dict(raw: dict[str, Any]) -> Event:
+    return Event(
+        url=raw['url'],
+        title=raw['title'],
+        description=raw['description'],
+        place_name=raw['place_name'],
+        place_address=raw['place_address'],
+        image_url=raw['image_url'],
+        date_times=[
+            Occurrence(
+                start=_datetime_from_dict(dt['start']),
+                end=dt['end'] and _datetime_from_dict(dt['end']),
+            )
+            for dt in raw['date_times']
+        ],
+    )
+
+
+def _datetime_to_dict(dt: datetime) -> dict[str, str]:
+    # Zone name is stored next to the offset, so the loaded datetime has
+    # the same `tzinfo` as the scrapped one
+    return {'iso': dt.isoformat(), 'tz': str(dt.tzinfo)}
+
+
+def _datetime_from_dict(raw: dict[str, str]) -> datetime:
+    return datetime.fromisoformat(raw['iso']).astimezone(ZoneInfo(raw['tz']))
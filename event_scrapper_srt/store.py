@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from typing import TYPE_CHECKING
+
+from event_scrapper_srt.event import GancioEvent
+
+if TYPE_CHECKING:
+    import os
+
+    from event_scrapper_srt.event import Event
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    url TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    place_name TEXT NOT NULL,
+    place_address TEXT NOT NULL,
+    image_url TEXT
+);
+CREATE INDEX IF NOT EXISTS events_place_name ON events (place_name);
+
+CREATE TABLE IF NOT EXISTS occurrences (
+    url TEXT NOT NULL REFERENCES events (url) ON DELETE CASCADE,
+    start_datetime INTEGER NOT NULL,
+    end_datetime INTEGER,
+    tz TEXT NOT NULL,
+    PRIMARY KEY (url, start_datetime)
+);
+CREATE INDEX IF NOT EXISTS occurrences_start_datetime ON occurrences (start_datetime);
+
+CREATE TABLE IF NOT EXISTS gancio_events (
+    url TEXT NOT NULL,
+    start_datetime INTEGER NOT NULL,
+    end_datetime INTEGER,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    place_name TEXT NOT NULL,
+    place_address TEXT NOT NULL,
+    online_locations TEXT NOT NULL,
+    multidate INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    image_url TEXT,
+    recurrent TEXT,
+    PRIMARY KEY (url, start_datetime)
+);
+CREATE INDEX IF NOT EXISTS gancio_events_start_datetime ON gancio_events (start_datetime);
+CREATE INDEX IF NOT EXISTS gancio_events_place_name ON gancio_events (place_name, start_datetime);
+"""
+
+_UPSERT_EVENT = """
+INSERT INTO events (url, title, description, place_name, place_address, image_url)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (url) DO UPDATE SET
+    title = excluded.title,
+    description = excluded.description,
+    place_name = excluded.place_name,
+    place_address = excluded.place_address,
+    image_url = excluded.image_url
+"""
+
+_UPSERT_OCCURRENCE = """
+INSERT INTO occurrences (url, start_datetime, end_datetime, tz) VALUES (?, ?, ?, ?)
+ON CONFLICT (url, start_datetime) DO UPDATE SET
+    end_datetime = excluded.end_datetime,
+    tz = excluded.tz
+"""
+
+_UPSERT_GANCIO_EVENT = """
+INSERT INTO gancio_events (
+    url, start_datetime, end_datetime, title, description, place_name,
+    place_address, online_locations, multidate, tags, image_url, recurrent
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (url, start_datetime) DO UPDATE SET
+    end_datetime = excluded.end_datetime,
+    title = excluded.title,
+    description = excluded.description,
+    place_name = excluded.place_name,
+    place_address = excluded.place_address,
+    online_locations = excluded.online_locations,
+    multidate = excluded.multidate,
+    tags = excluded.tags,
+    image_url = excluded.image_url,
+    recurrent = excluded.recurrent
+"""
+
+# Columns added after the first version of the schema, with their types
+_ADDED_COLUMNS = {'gancio_events': {'recurrent': 'TEXT'}}
+
+# Occurrences removed from the page are removed from the store as well
+_DELETE_STALE = """
+DELETE FROM {table}
+WHERE url = ? AND start_datetime NOT IN (SELECT value FROM json_each(?))
+"""
+
+
+class EventStore:
+    """SQLite database of scrapped events, queryable by time and place.
+
+    Scrapped events, their occurrences, and Gancio events prepared from
+    them are upserted, keyed by the URL of the page and the start time, so
+    repeated runs update the rows in place. Writes are buffered and
+    committed in batches of `batch_size` scrapped events.
+
+    Args:
+    ----
+        path: The path of the database file, created if it doesn't exist.
+        batch_size: The number of scrapped events written in one transaction.
+
+    """
+
+    def __init__(self, path: str | os.PathLike[str], batch_size: int = 100) -> None:
+        self.batch_size = batch_size
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA foreign_keys = ON')
+        self._connection.executescript(_SCHEMA)
+        self._migrate()
+        self._pending: list[tuple[Event, list[GancioEvent]]] = []
+
+    def __enter__(self) -> EventStore:
+        """Return the store, closed when the context is left."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the store."""
+        self.close()
+
+    def add(self, event: Event, gancio_events: list[GancioEvent]) -> None:
+        """Buffer the scrapped event with its Gancio events, committing full batches."""
+        self._pending.append((event, gancio_events))
+        if len(self._pending) >= self.batch_size:
+            self.commit()
+
+    def commit(self) -> None:
+        """Write the buffered events in a single transaction."""
+        if not self._pending:
+            return
+        with self._connection:
+            for event, gancio_events in self._pending:
+                self._upsert(event, gancio_events)
+        logging.debug(f'Stored {len(self._pending)} events in the database')
+        self._pending.clear()
+
+    def close(self) -> None:
+        """Commit the buffered events and close the database."""
+        self.commit()
+        self._connection.close()
+
+    def query(
+        self,
+        start_from: int | None = None,
+        start_to: int | None = None,
+        place_name: str | None = None,
+    ) -> list[GancioEvent]:
+        """Return stored Gancio events ordered by the start time.
+
+        Buffered events are committed first, so they are included.
+
+        Args:
+        ----
+            start_from: Only events starting at or after this Unix timestamp.
+            start_to: Only events starting before this Unix timestamp.
+            place_name: Only events taking place there.
+
+        """
+        self.commit()
+        conditions = []
+        params: list[object] = []
+        if start_from is not None:
+            conditions.append('start_datetime >= ?')
+            params.append(start_from)
+        if start_to is not None:
+            conditions.append('start_datetime < ?')
+            params.append(start_to)
+        if place_name is not None:
+            conditions.append('place_name = ?')
+            params.append(place_name)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = self._connection.execute(
+            'SELECT title, description, place_name, place_address, online_locations, '
+            'start_datetime, end_datetime, multidate, tags, image_url, recurrent '
+            f'FROM gancio_events {where} ORDER BY start_datetime, url',
+            params,
+        )
+        return [
+            GancioEvent(
+                title=title,
+                description=description,
+                place_name=place_name,
+                place_address=place_address,
+                online_locations=json.loads(online_locations),
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+                multidate=multidate,
+                tags=json.loads(tags),
+                image_url=image_url,
+                recurrent=json.loads(recurrent) if recurrent else None,
+            )
+            for (
+                title,
+                description,
+                place_name,
+                place_address,
+                online_locations,
+                start_datetime,
+                end_datetime,
+                multidate,
+                tags,
+                image_url,
+                recurrent,
+            ) in rows
+        ]
+
+    def _migrate(self) -> None:
+        # Databases created by older versions lack the added columns
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row[1] for row in self._connection.execute(f'PRAGMA table_info({table})')}
+            for name, column_type in columns.items():
+                if name not in existing:
+                    logging.info(f'Adding column `{name}` to the `{table}` table')
+                    self._connection.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+
+    def _upsert(self, event: Event, gancio_events: list[GancioEvent]) -> None:
+        execute = self._connection.execute
+        execute(
+            _UPSERT_EVENT,
+            (
+                event.url,
+                event.title,
+                event.description,
+                event.place_name,
+                event.place_address,
+                event.image_url,
+            ),
+        )
+        starts = [int(dt.start.timestamp()) for dt in event.date_times]
+        for table in ('occurrences', 'gancio_events'):
+            execute(_DELETE_STALE.format(table=table), (event.url, json.dumps(starts)))
+        self._connection.executemany(
+            _UPSERT_OCCURRENCE,
+            [
+                (
+                    event.url,
+                    int(dt.start.timestamp()),
+                    int(dt.end.timestamp()) if dt.end else None,
+                    str(dt.start.tzinfo),
+                )
+                for dt in event.date_times
+            ],
+        )
+        self._connection.executemany(
+            _UPSERT_GANCIO_EVENT,
+            [
+                (
+                    event.url,
+                    gancio_event.start_datetime,
+                    gancio_event.end_datetime,
+                    gancio_event.title,
+                    gancio_event.description,
+                    gancio_event.place_name,
+                    gancio_event.place_address,
+                    json.dumps(gancio_event.online_locations),
+                    gancio_event.multidate,
+                    json.dumps(gancio_event.tags),
+                    gancio_event.image_url,
+                    json.dumps(gancio_event.recurrent) if gancio_event.recurrent else None,
+                )
+                for gancio_event in gancio_events
+            ],
+        )
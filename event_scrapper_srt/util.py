@@ -1,8 +1,121 @@
 from __future__ import annotations
 
-import urllib.request
+import http.client
+import logging
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from event_scrapper_srt.client import HttpClient
+from event_scrapper_srt.metrics import METRICS
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+    from concurrent.futures import Future
+
+
+# Client shared by all the requests made by the app, so connections to
+# the same host are reused.
+DEFAULT_CLIENT = HttpClient()
 
 
 def get_url_content(url: str) -> bytes:
-    with urllib.request.urlopen(url) as response:
-        return response.read()
+    return DEFAULT_CLIENT.get_content(url)
+
+
+def fetch_all(
+    urls: Iterable[str],
+    content_getter: Callable[[str], bytes] = get_url_content,
+    concurrency: int = 1,
+    max_per_host: int = 4,
+    metric: str = 'page_fetch',
+) -> Iterator[tuple[str, bytes | None]]:
+    """Fetch content of the provided URLs in a bounded pool of threads.
+
+    Results are yielded in the same order as the input URLs, as soon as
+    they are available. If fetching a URL fails, the error is logged and
+    `None` is yielded as its content, so a single failing page doesn't
+    abort the others.
+
+    Args:
+    ----
+        urls: The URLs to fetch.
+        content_getter: Function used to fetch a single URL.
+        concurrency: The maximum number of URLs fetched at the same time.
+        max_per_host: The maximum number of URLs fetched at the same time
+                      from a single host.
+        metric: The prefix of the names of the recorded metrics.
+
+    """
+    host_limits: defaultdict[str, threading.BoundedSemaphore] = defaultdict(
+        lambda: threading.BoundedSemaphore(max_per_host)
+    )
+    lock = threading.Lock()
+
+    def fetch(url: str) -> bytes:
+        with lock:
+            host_limit = host_limits[urllib.parse.urlsplit(url).netloc]
+        with host_limit, METRICS.timer(f'{metric}_seconds'):
+            content = content_getter(url)
+        METRICS.inc(f'{metric}_bytes_total', len(content))
+        return content
+
+    def result(url: str, future: Future[bytes]) -> tuple[str, bytes | None]:
+        try:
+            return url, future.result()
+        except (OSError, http.client.HTTPException) as err:
+            METRICS.inc(f'{metric}_errors_total')
+            logging.warning(f'Failed to fetch `{url}`. Error: `{err}`')
+            return url, None
+
+    # Only a limited number of pages is fetched ahead of the consumer, so
+    # memory usage doesn't grow with the number of URLs
+    window = max(concurrency, 1) * 2
+    pending: deque[tuple[str, Future[bytes]]] = deque()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for url in urls:
+            pending.append((url, executor.submit(fetch, url)))
+            if len(pending) >= window:
+                yield result(*pending.popleft())
+        while pending:
+            yield result(*pending.popleft())
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Args:
+    ----
+        rate: The number of tokens added per second.
+        capacity: The maximum number of tokens, i.e. the allowed burst.
+
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        if rate <= 0:
+            msg = f'expected a positive rate, got {rate}'
+            raise ValueError(msg)
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, waiting until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
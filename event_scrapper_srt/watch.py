@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from event_scrapper_srt import gancio
+from event_scrapper_srt import scrapper
+from event_scrapper_srt import sitemap
+from event_scrapper_srt import util
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Iterator
+    from datetime import timedelta
+
+    from event_scrapper_srt.event import Event
+    from event_scrapper_srt.event import GancioEvent
+    from event_scrapper_srt.state import StateEntry
+
+
+class AdaptiveInterval:
+    """Poll interval adapting to how often the polled resource changes.
+
+    The interval is divided by `factor` after a poll which found changes,
+    and multiplied by it after a poll which didn't, staying between
+    `minimum` and `maximum`.
+
+    Args:
+    ----
+        minimum: The shortest interval in seconds.
+        maximum: The longest interval in seconds.
+        factor: How much the interval changes after each poll.
+
+    """
+
+    def __init__(self, minimum: float, maximum: float, factor: float = 2.0) -> None:
+        if not 0 < minimum <= maximum:
+            msg = f'expected 0 < minimum <= maximum, got {minimum} and {maximum}'
+            raise ValueError(msg)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.current = minimum
+
+    def update(self, *, changed: bool) -> float:
+        """Adapt the interval to the result of the poll and return it."""
+        if changed:
+            self.current = max(self.minimum, self.current / self.factor)
+        else:
+            self.current = min(self.maximum, self.current * self.factor)
+        return self.current
+
+
+@dataclass(frozen=True)
+class Cycle:
+    """Result of a single poll of the sitemap.
+
+    Args:
+    ----
+        updates: New or changed scrapped events, with their Gancio events
+                 which are new or changed since the previous cycle.
+        state: The state after the cycle, to be used by the next one.
+
+    """
+
+    updates: list[tuple[Event, list[GancioEvent]]]
+    state: dict[str, StateEntry]
+
+
+def watch(
+    sitemap_url: str,
+    state: dict[str, StateEntry],
+    interval: AdaptiveInterval,
+    content_getter: Callable[[str], bytes] = util.get_url_content,
+    concurrency: int = 1,
+    engine: str = 'bs4',
+    parse_workers: int = 0,
+    *,
+    recurrent: bool = False,
+    horizon: timedelta = gancio.RECURRENT_HORIZON,
+    sleep: Callable[[float], object] = time.sleep,
+    max_cycles: int | None = None,
+) -> Iterator[Cycle]:
+    """Poll the sitemap, yielding events changed since the previous poll.
+
+    Only pages whose sitemap lastmod changed are scrapped again, see
+    `scrapper.get_events_incremental`. Between the polls it sleeps for
+    the adaptive `interval`, so a sitemap which rarely changes is polled
+    rarely. If the cycle fails, e.g. the sitemap fails to download or is
+    only partially written, the error is logged and the cycle yields no
+    updates, so the watch keeps going.
+
+    Args:
+    ----
+        sitemap_url: The URL of the sitemap to poll.
+        state: The state of the previous run, empty to emit all events in
+               the first cycle.
+        interval: The poll interval.
+        content_getter: Function used to fetch the sitemap and the pages.
+        concurrency: The number of pages downloaded at the same time.
+        engine: The HTML extraction engine.
+        parse_workers: The number of processes parsing pages.
+        recurrent: Collapse regularly repeating occurrences into recurrent
+                   Gancio events, see `gancio.prepare_event`.
+        horizon: How far ahead the website lists dates, see
+                 `gancio.prepare_event`.
+        sleep: Function sleeping for the given number of seconds.
+        max_cycles: Stop after this number of cycles. Runs forever if `None`.
+
+    """
+    cycle = 0
+    while max_cycles is None or cycle < max_cycles:
+        if cycle:
+            sleep(interval.current)
+        cycle += 1
+        try:
+            updates, new_state = _poll(
+                sitemap_url,
+                state,
+                content_getter=content_getter,
+                concurrency=concurrency,
+                engine=engine,
+                parse_workers=parse_workers,
+                prepare=functools.partial(
+                    gancio.prepare_event, recurrent=recurrent, horizon=horizon
+                ),
+            )
+        except OSError as err:
+            logging.warning(f'Failed to fetch `{sitemap_url}` or its pages. Error: `{err}`')
+            interval.update(changed=False)
+            yield Cycle(updates=[], state=state)
+            continue
+        except Exception:
+            # A single broken sitemap or page mustn't stop the daemon
+            logging.exception(f'Watch cycle {cycle} failed, retrying in the next one')
+            interval.update(changed=False)
+            yield Cycle(updates=[], state=state)
+            continue
+
+        changed = new_state != state
+        state = new_state
+        logging.info(
+            f'Watch cycle {cycle}: {len(updates)} new or changed events, '
+            f'next poll in {interval.update(changed=changed):.0f}s'
+        )
+        yield Cycle(updates=updates, state=state)
+
+
+def _poll(
+    sitemap_url: str,
+    state: dict[str, StateEntry],
+    content_getter: Callable[[str], bytes],
+    concurrency: int,
+    engine: str,
+    parse_workers: int,
+    prepare: Callable[[Event], list[GancioEvent]],
+) -> tuple[list[tuple[Event, list[GancioEvent]]], dict[str, StateEntry]]:
+    elements = sitemap.fetch_elements(
+        sitemap_url, content_getter=content_getter, concurrency=concurrency
+    )
+    events, new_state = scrapper.get_events_incremental(
+        elements,
+        state,
+        content_getter=content_getter,
+        concurrency=concurrency,
+        engine=engine,
+        parse_workers=parse_workers,
+    )
+    updates = []
+    for event in events:
+        previous = state.get(event.url)
+        if previous is not None and previous.event == event:
+            continue
+        old = prepare(previous.event) if previous else []
+        gancio_events = [e for e in prepare(event) if e not in old]
+        if gancio_events:
+            updates.append((event, gancio_events))
+    return updates, new_state
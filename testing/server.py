@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Reply:
+    """Canned response returned by the stand-in server."""
+
+    status: int = 200
+    body: bytes = b''
+    headers: dict[str, str] = field(default_factory=dict)
+    delay: float = 0.0
+
+
+@dataclass(frozen=True)
+class ReceivedRequest:
+    """Request received by the stand-in server."""
+
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+
+
+class StandInServer:
+    """Local HTTP server replying with canned responses.
+
+    Use as a context manager. Replies registered for a path with `add`
+    are returned one by one, and the last one is repeated afterwards.
+    Query string is ignored when matching paths. Unknown paths get 404.
+    """
+
+    def __init__(self) -> None:
+        self.routes: dict[str, list[Reply]] = {}
+        self.requests: list[ReceivedRequest] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=functools.partial(self._httpd.serve_forever, poll_interval=0.05), daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server, without a trailing slash."""
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host!s}:{port}'
+
+    def add(self, path: str, *replies: Reply) -> None:
+        """Register replies returned for the provided path."""
+        self.routes[path] = list(replies)
+
+    def __enter__(self) -> StandInServer:
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Stop the server."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _next_reply(self, request: ReceivedRequest) -> Reply:
+        with self._lock:
+            self.requests.append(request)
+            replies = self.routes.get(request.path.partition('?')[0])
+            if not replies:
+                return Reply(status=404)
+            return replies.pop(0) if len(replies) > 1 else replies[0]
+
+    def _on_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+
+def _make_handler(server: StandInServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self) -> None:
+            super().setup()
+            server._on_connection()  # noqa: SLF001
+
+        def do_GET(self) -> None:  # noqa: N802
+            self._reply()
+
+        def do_POST(self) -> None:  # noqa: N802
+            self._reply()
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _reply(self) -> None:
+            length = int(self.headers.get('Content-Length', 0))
+            request = ReceivedRequest(
+                method=self.command,
+                path=self.path,
+                headers=dict(self.headers),
+                body=self.rfile.read(length),
+            )
+            reply = server._next_reply(request)  # noqa: SLF001
+            time.sleep(reply.delay)
+            self.send_response(reply.status)
+            for name, value in reply.headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(reply.body)))
+            self.end_headers()
+            self.wfile.write(reply.body)
+
+    return Handler
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import datetime
+from datetime import timezone
+
+import pytest
+
+from event_scrapper_srt import util
+from event_scrapper_srt.archive import PageArchive
+from testing import fakes
+
+
+def test_recording_and_replay(tmp_path):
+    archive = PageArchive(tmp_path)
+    content_getter = archive.recording(fakes.content_getter)
+    expected = fakes.content_getter('testing/example-event.html')
+    assert content_getter('testing/example-event.html') == expected
+
+    replayed = PageArchive(tmp_path)
+    assert replayed.get_content('testing/example-event.html') == expected
+    assert replayed.fetched_at('testing/example-event.html') is not None
+
+
+def test_archive_deduplicates_content(tmp_path):
+    archive = PageArchive(tmp_path)
+    first = datetime(2024, 7, 1, tzinfo=timezone.utc)
+    second = datetime(2024, 7, 2, tzinfo=timezone.utc)
+    archive.put('https://example.com/a', b'same', fetched_at=first)
+    archive.put('https://example.com/b', b'same', fetched_at=first)
+    archive.put('https://example.com/a', b'same', fetched_at=second)
+
+    assert len(list((tmp_path / 'objects').glob('*/*.gz'))) == 1
+    assert len((tmp_path / 'index.ndjson').read_text().splitlines()) == 3
+    assert PageArchive(tmp_path).fetched_at('https://example.com/a') == second
+
+
+def test_replay_latest_fetch(tmp_path):
+    archive = PageArchive(tmp_path)
+    archive.put('https://example.com/a', b'old')
+    archive.put('https://example.com/a', b'new')
+    assert PageArchive(tmp_path).get_content('https://example.com/a') == b'new'
+
+
+def test_missing_page_is_skipped(tmp_path):
+    archive = PageArchive(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        archive.get_content('https://example.com/missing')
+    assert list(util.fetch_all(['https://example.com/missing'], archive.get_content)) == [
+        ('https://example.com/missing', None)
+    ]
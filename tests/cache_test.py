@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from event_scrapper_srt.cache import CachedPage
+from event_scrapper_srt.cache import HttpCache
+
+
+def test_cache_round_trip(tmp_path):
+    page = CachedPage(body=b'hello', etag='"v1"', last_modified=None)
+    HttpCache(tmp_path).put('https://example.com/', page)
+    assert HttpCache(tmp_path).get('https://example.com/') == page
+
+
+def test_cache_skips_page_without_validators(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.put('https://example.com/', CachedPage(body=b'hello', etag=None, last_modified=None))
+    assert cache.get('https://example.com/') is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = HttpCache(tmp_path, max_size=10)
+    cache.put('a', CachedPage(body=b'12345', etag='"a"', last_modified=None))
+    (a_path,) = tmp_path.glob('*.body')
+    cache.put('b', CachedPage(body=b'12345', etag='"b"', last_modified=None))
+    (b_path,) = set(tmp_path.glob('*.body')) - {a_path}
+    os.utime(a_path, (1, 1))
+    os.utime(b_path, (2, 2))
+    # Reading the entry marks it as recently used
+    assert cache.get('a') is not None
+
+    cache.put('c', CachedPage(body=b'12345', etag='"c"', last_modified=None))
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+
+
+def test_cache_evicts_least_recently_used_from_previous_run(tmp_path):
+    cache = HttpCache(tmp_path, max_size=10)
+    cache.put('a', CachedPage(body=b'12345', etag='"a"', last_modified=None))
+    (a_path,) = tmp_path.glob('*.body')
+    cache.put('b', CachedPage(body=b'12345', etag='"b"', last_modified=None))
+    (b_path,) = set(tmp_path.glob('*.body')) - {a_path}
+    # Usage order of the previous run is restored from mtime
+    os.utime(a_path, (2, 2))
+    os.utime(b_path, (1, 1))
+
+    HttpCache(tmp_path, max_size=10).put(
+        'c', CachedPage(body=b'12345', etag='"c"', last_modified=None)
+    )
+
+    assert a_path.exists()
+    assert not b_path.exists()
+
+
+def test_cache_put_interrupted_leaves_no_entry(tmp_path, monkeypatch):
+    cache = HttpCache(tmp_path)
+    cache.put('a', CachedPage(body=b'old', etag='"v1"', last_modified=None))
+    original_write_bytes = Path.write_bytes
+
+    def write_bytes(path, data):
+        # The run is killed in the middle of writing the body
+        original_write_bytes(path, data[:1])
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(Path, 'write_bytes', write_bytes)
+    with pytest.raises(KeyboardInterrupt):
+        cache.put('a', CachedPage(body=b'new', etag='"v2"', last_modified=None))
+    monkeypatch.undo()
+
+    assert HttpCache(tmp_path).get('a') is None
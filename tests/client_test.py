@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import gzip
+import http.client
+import json
+import random
+import socket
+import urllib.error
+import zlib
+
+import pytest
+
+from event_scrapper_srt import gancio
+from event_scrapper_srt.cache import HttpCache
+from event_scrapper_srt import util
+from event_scrapper_srt.client import ContentDecodingError
+from event_scrapper_srt.client import HttpClient
+from event_scrapper_srt.client import PageTooLargeError
+from testing import resources
+from testing.server import Reply
+
+
+def test_get_content_reuses_connection(server):
+    server.add('/page', Reply(body=b'hello'))
+    client = HttpClient()
+    assert [client.get_content(f'{server.url}/page') for _ in range(3)] == [b'hello'] * 3
+    assert server.connections == 1
+    client.close()
+
+
+def _disconnect_idle(client):
+    for connections in client._idle.values():  # noqa: SLF001
+        for conn in connections:
+            conn.sock.shutdown(socket.SHUT_RDWR)
+
+
+def test_get_content_resent_on_closed_idle_connection(server):
+    server.add('/page', Reply(body=b'hello'))
+    client = HttpClient()
+    client.get_content(f'{server.url}/page')
+    _disconnect_idle(client)
+    assert client.get_content(f'{server.url}/page') == b'hello'
+    assert server.connections == 2
+    client.close()
+
+
+def test_post_not_resent_on_closed_idle_connection(server):
+    server.add('/page', Reply(body=b'hello'))
+    client = HttpClient()
+    client.get_content(f'{server.url}/page')
+    _disconnect_idle(client)
+    with pytest.raises((http.client.RemoteDisconnected, ConnectionError)):
+        client.request('POST', f'{server.url}/page', body=b'{}')
+    assert [request.method for request in server.requests] == ['GET']
+    client.close()
+
+
+@pytest.mark.parametrize(
+    ('encoding', 'compress'),
+    [
+        ('gzip', gzip.compress),
+        ('gzip', lambda data: gzip.compress(data[:2]) + gzip.compress(data[2:])),
+        ('deflate', zlib.compress),
+        ('deflate', lambda data: zlib.compress(data, wbits=-zlib.MAX_WBITS)),
+    ],
+)
+def test_get_content_decompresses(server, encoding, compress):
+    server.add('/page', Reply(body=compress(b'hello'), headers={'Content-Encoding': encoding}))
+    assert HttpClient().get_content(f'{server.url}/page') == b'hello'
+    assert server.requests[0].headers['Accept-Encoding'] == 'gzip, deflate'
+
+
+def test_get_content_follows_redirect(server):
+    server.add('/old', Reply(status=301, headers={'Location': '/new'}))
+    server.add('/new', Reply(body=b'moved'))
+    assert HttpClient().get_content(f'{server.url}/old') == b'moved'
+
+
+def test_get_content_raises_http_error(server):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        HttpClient().get_content(f'{server.url}/missing')
+    assert excinfo.value.code == 404
+
+
+def test_add_event(server):
+    server.add('/api/event', Reply(body=b'{"id": 1}'))
+    event = resources.example_event_gancio[0]
+    actual = gancio.add_event(event, instance_url=server.url, client=HttpClient())
+    assert actual == {'id': 1}
+    assert server.requests[0].method == 'POST'
+    assert json.loads(server.requests[0].body)['title'] == event.title
+
+
+def test_get_content_served_from_cache_on_304(server, tmp_path):
+    validators = {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jul 2024 00:00:00 GMT'}
+    server.add('/page', Reply(body=b'hello', headers=validators), Reply(status=304))
+    cache = HttpCache(tmp_path)
+    client = HttpClient(cache=cache)
+    assert client.get_content(f'{server.url}/page') == b'hello'
+    assert client.get_content(f'{server.url}/page') == b'hello'
+    assert server.requests[1].headers['If-None-Match'] == '"v1"'
+    assert server.requests[1].headers['If-Modified-Since'] == 'Mon, 01 Jul 2024 00:00:00 GMT'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_content_streams_body_up_to_limit(server):
+    body = bytes(range(256)) * 1000
+    server.add('/page', Reply(body=body))
+    assert HttpClient(max_body_size=len(body)).get_content(f'{server.url}/page') == body
+
+
+def test_get_content_rejects_too_large_body(server):
+    server.add('/large', Reply(body=b'x' * 100))
+    server.add('/small', Reply(body=b'hello'))
+    client = HttpClient(max_body_size=10)
+    with pytest.raises(PageTooLargeError):
+        client.get_content(f'{server.url}/large')
+    assert client.get_content(f'{server.url}/small') == b'hello'
+
+
+def test_get_content_rejects_too_large_decompressed_body(server):
+    body = gzip.compress(b'x' * 10**6)
+    server.add('/page', Reply(body=body, headers={'Content-Encoding': 'gzip'}))
+    assert len(body) < 10**5
+    client = HttpClient(max_body_size=10**5)
+    with pytest.raises(PageTooLargeError, match='exceeds the limit of 100000 bytes'):
+        client.get_content(f'{server.url}/page')
+
+
+@pytest.mark.parametrize(
+    ('body', 'match'),
+    [
+        (b'garbage' * 100, 'Failed to decompress'),
+        (gzip.compress(random.Random(0).randbytes(10**5))[: 10**4], 'truncated'),
+    ],
+    ids=['corrupt', 'truncated'],
+)
+def test_get_content_rejects_corrupt_compressed_body(server, body, match):
+    server.add('/page', Reply(body=body, headers={'Content-Encoding': 'gzip'}))
+    client = HttpClient()
+    with pytest.raises(ContentDecodingError, match=match):
+        client.get_content(f'{server.url}/page')
+    # The page is skipped like any other page which failed to download
+    assert list(util.fetch_all([f'{server.url}/page'], client.get_content)) == [
+        (f'{server.url}/page', None)
+    ]
+    client.close()
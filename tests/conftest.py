@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+import pytest
+
+from testing.server import StandInServer
+
+
+@pytest.fixture()
+def server():
+    with StandInServer() as srv:
+        yield srv
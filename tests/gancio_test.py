@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import datetime
+import json
 import logging
+from dataclasses import replace
 
 import freezegun
 import pytest
 
 from event_scrapper_srt import gancio
+from event_scrapper_srt import ledger
+from event_scrapper_srt.client import HttpClient
+from event_scrapper_srt.event import Occurrence
 from testing import resources
+from testing.server import Reply
 
 
 @pytest.mark.parametrize(
@@ -55,3 +62,145 @@ def test_prepare_gancio_event_no_date_times_found(caplog):
         '[Swingowa potańcówka nad Motławą] No Gancio events created: '
         'no future `date_times` found' in caplog.text
     )
+
+
+def test_publish_events_retries_server_errors(server):
+    server.add('/api/event', Reply(status=503), Reply(body=b'{"id": 1}'))
+    results = gancio.publish_events(
+        resources.example_event_gancio, server.url, client=HttpClient(), backoff=0
+    )
+    assert [(result.ok, result.attempts) for result in results] == [(True, 2)]
+    assert results[0].response == {'id': 1}
+
+
+def test_publish_events_does_not_retry_client_errors(server, caplog):
+    caplog.set_level(logging.INFO)
+    server.add('/api/event', Reply(status=400))
+    results = gancio.publish_events(
+        resources.example_event_recurring_gancio, server.url, client=HttpClient(), backoff=0
+    )
+    assert [(result.ok, result.attempts) for result in results] == [(False, 1), (False, 1)]
+    assert results[0].error == 'HTTP 400 Bad Request'
+    assert len(server.requests) == 2
+    assert 'Published 0 of 2 events' in caplog.text
+
+
+def test_publish_events_gives_up_after_retries(server):
+    server.add('/api/event', Reply(status=500))
+    results = gancio.publish_events(
+        resources.example_event_gancio, server.url, client=HttpClient(), retries=2, backoff=0
+    )
+    assert [(result.ok, result.attempts) for result in results] == [(False, 3)]
+
+
+def test_publish_events_fails_only_event_with_invalid_response(server):
+    server.add('/api/event', Reply(body=b'<html>Maintenance</html>'), Reply(body=b'{"id": 2}'))
+    results = gancio.publish_events(
+        resources.example_event_recurring_gancio,
+        server.url,
+        client=HttpClient(),
+        max_in_flight=1,
+        backoff=0,
+    )
+    assert [(result.ok, result.attempts) for result in results] == [(False, 1), (True, 1)]
+    assert results[0].error == 'Invalid response: Expecting value: line 1 column 1 (char 0)'
+
+
+def test_fetch_published_keys(server):
+    published = [
+        {'id': 1, 'start_datetime': 1720375200, 'online_locations': ['https://example.com/a']},
+        {'id': 2, 'start_datetime': 1720980000, 'online_locations': []},
+    ]
+    server.add('/api/events', Reply(body=json.dumps(published).encode()))
+    actual = gancio.fetch_published_keys(server.url, client=HttpClient())
+    assert actual == {('https://example.com/a', 1720375200)}
+    assert server.requests[0].path.startswith('/api/events?start=')
+
+
+def test_fetch_published_keys_of_recurrent_series(server):
+    # Occurrence of a weekly series, on Sunday 7 July 2024 at 20:00 in Warsaw
+    published = [
+        {
+            'id': 3,
+            'start_datetime': 1720375200,
+            'online_locations': ['https://example.com/a'],
+            'parent': {'recurrent': {'frequency': '1w'}},
+        },
+    ]
+    server.add('/api/events', Reply(body=json.dumps(published).encode()))
+    actual = gancio.fetch_published_keys(server.url, client=HttpClient())
+    assert actual == {
+        ('https://example.com/a', 1720375200),
+        ('https://example.com/a', '1w/7/20:00'),
+    }
+
+
+def test_sync_events_skips_published(server):
+    server.add('/api/event', Reply(body=b'{"id": 2}'))
+    first, second = resources.example_event_recurring_gancio
+    results = gancio.sync_events(
+        [first, second], server.url, published={gancio.event_key(first)}, client=HttpClient()
+    )
+    assert [result.event for result in results] == [second]
+    assert len(server.requests) == 1
+
+
+def test_ledger_keeps_recurrent_series(tmp_path):
+    published: dict[gancio.EventKey, object] = {
+        ('https://example.com/a', 1720375200): 1,
+        ('https://example.com/a', '1w/7/20:00'): 2,
+    }
+    ledger.save_ledger(tmp_path / 'ledger.json', published)
+    assert ledger.load_ledger(tmp_path / 'ledger.json') == published
+
+
+@freezegun.freeze_time('2024-07-01')
+def test_prepare_event_recurrent():
+    first = resources.example_event_recurring.date_times[0]
+    weekly = [
+        Occurrence(start=first.start + week, end=first.end + week if first.end else None)
+        for week in (datetime.timedelta(weeks=i) for i in range(4))
+    ]
+    extra = resources.example_event.date_times[0]
+    event = replace(resources.example_event_recurring, date_times=[*weekly, extra])
+
+    actual = gancio.prepare_event(event, recurrent=True)
+
+    assert [(e.start_datetime, e.multidate, e.recurrent) for e in actual] == [
+        (int(first.start.timestamp()), 0, {'frequency': '1w'}),
+        (int(extra.start.timestamp()), 1, None),
+    ]
+    assert 'recurrent' not in gancio.to_dict(actual[1])
+
+
+def test_prepare_event_skips_occurrences_before_now():
+    now = datetime.datetime(2024, 7, 10, tzinfo=datetime.timezone.utc)
+    actual = gancio.prepare_event(resources.example_event_recurring, now=now)
+    assert actual == [resources.example_event_recurring_gancio[1]]
+
+
+def _weekly(count):
+    start = resources.example_event_recurring.date_times[0].start
+    weeks = [datetime.timedelta(weeks=i) for i in range(count)]
+    duration = datetime.timedelta(hours=3)
+    return replace(
+        resources.example_event_recurring,
+        date_times=[Occurrence(start=start + week, end=start + week + duration) for week in weeks],
+    )
+
+
+@freezegun.freeze_time('2024-07-01')
+def test_prepare_event_keeps_finished_run_as_separate_events():
+    # The run ends on 21 July, although the website lists dates until 29 July
+    actual = gancio.prepare_event(_weekly(3), recurrent=True)
+    assert [(e.multidate, e.recurrent) for e in actual] == [(1, None)] * 3
+
+
+def test_recurrent_event_key_stable_when_first_occurrence_passes():
+    event = _weekly(6)
+    with freezegun.freeze_time('2024-07-01'):
+        (before,) = gancio.prepare_event(event, recurrent=True)
+    with freezegun.freeze_time('2024-07-10'):
+        (after,) = gancio.prepare_event(event, recurrent=True)
+    assert before.start_datetime != after.start_datetime
+    assert gancio.event_key(before) == gancio.event_key(after) == (event.url, '1w/7/20:00')
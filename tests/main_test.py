@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+
+import freezegun
+import pytest
+
+from event_scrapper_srt import main
+from event_scrapper_srt import ndjson
+from event_scrapper_srt.archive import PageArchive
+from event_scrapper_srt.store import EventStore
+from testing import fakes
+from testing import resources
+from testing.server import Reply
+
+
+def test_dump_events_to_json(capsys):
+    events = resources.example_event_recurring_gancio
+    count = main.dump_events_to_json(iter(events))
+    lines = capsys.readouterr().out.splitlines()
+    assert count == len(lines) == len(events)
+    assert [json.loads(line)['start_datetime'] for line in lines] == [
+        event.start_datetime for event in events
+    ]
+
+
+def test_dump_and_read_events(capsys):
+    events = resources.example_event_gancio + resources.example_event_recurring_gancio
+    main.dump_events_to_json(events)
+    lines = capsys.readouterr().out.splitlines(keepends=True)
+    assert list(ndjson.read_events(lines)) == events
+
+
+def test_dump_grouped_and_read_events(capsys):
+    events = resources.example_event_gancio + resources.example_event_recurring_gancio
+    count = main.dump_events_to_json(events, output_format='grouped')
+    lines = capsys.readouterr().out.splitlines(keepends=True)
+    assert count == len(events)
+    assert len(lines) == 2
+    assert list(ndjson.read_events(lines)) == events
+
+
+def test_publish_command(server, tmp_path, capsys):
+    server.add('/api/event', Reply(body=b'{"id": 1}'))
+    main.dump_events_to_json(resources.example_event_recurring_gancio)
+    input_path = tmp_path / 'events.ndjson'
+    input_path.write_text(capsys.readouterr().out)
+    assert main.main(['publish', str(input_path), '--instance-url', server.url]) == 0
+    assert len(server.requests) == 2
+
+
+def test_publish_command_sync_with_ledger(server, tmp_path, capsys):
+    server.add('/api/event', Reply(body=b'{"id": 1}'))
+    server.add('/api/events', Reply(body=b'[]'))
+    main.dump_events_to_json(resources.example_event_recurring_gancio)
+    input_path = tmp_path / 'events.ndjson'
+    input_path.write_text(capsys.readouterr().out)
+    argv = [
+        'publish',
+        str(input_path),
+        '--instance-url',
+        server.url,
+        '--sync',
+        '--ledger',
+        str(tmp_path / 'ledger.json'),
+    ]
+
+    assert main.main(argv) == 0
+    assert main.main(argv) == 0
+
+    posted = [request for request in server.requests if request.method == 'POST']
+    assert len(posted) == 2
+
+
+def test_events_command(tmp_path, capsys):
+    with EventStore(tmp_path / 'events.db') as store:
+        store.add(resources.example_event, resources.example_event_gancio)
+        store.add(resources.example_event_recurring, resources.example_event_recurring_gancio)
+    argv = ['events', str(tmp_path / 'events.db'), '--from', '2024-07-08', '--to', '2024-07-27']
+
+    assert main.main([*argv, '--place', 'Studio Swing Revolution Trójmiasto']) == 0
+    lines = capsys.readouterr().out.splitlines(keepends=True)
+    assert list(ndjson.read_events(lines)) == resources.example_event_recurring_gancio[1:]
+
+    assert main.main([*argv, '--place', 'Elsewhere']) == 0
+    assert capsys.readouterr().out == ''
+
+
+def test_output_rejects_unknown_backend(capsys):
+    with pytest.raises(SystemExit):
+        main.main(['--output', 'postgres:events'])
+    assert 'expected `-` or `sqlite:PATH`' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('options', [[], ['--future-only']])
+def test_replay_archive(tmp_path, capsys, options):
+    archive = PageArchive(tmp_path)
+    with freezegun.freeze_time('2024-07-01'):
+        archive.put(
+            'https://example.com/sitemap.xml',
+            b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url>'
+            b'<loc>testing/example-event.html</loc><lastmod>2024-06-25T10:08:35+00:00</lastmod>'
+            b'</url></urlset>',
+        )
+        archive.put(
+            'testing/example-event.html', fakes.content_getter('testing/example-event.html')
+        )
+    argv = ['--sitemap-url', 'https://example.com/sitemap.xml', '--replay', str(tmp_path)]
+
+    # The events have passed since the archive was fetched
+    with freezegun.freeze_time('2025-01-01'):
+        assert main.main([*argv, *options]) == 0
+
+    lines = capsys.readouterr().out.splitlines(keepends=True)
+    assert list(ndjson.read_events(lines)) == resources.example_event_gancio
+
+
+@freezegun.freeze_time('2024-07-01')
+def test_watch_command(server, tmp_path, capsys):
+    server.add(
+        '/sitemap.xml',
+        Reply(
+            body=b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url>'
+            + f'<loc>{server.url}/event</loc>'.encode()
+            + b'<lastmod>2024-06-25T10:08:35+00:00</lastmod></url></urlset>'
+        ),
+    )
+    server.add('/event', Reply(body=fakes.content_getter('testing/example-event.html')))
+    argv = [
+        '--sitemap-url',
+        f'{server.url}/sitemap.xml',
+        '--state-file',
+        str(tmp_path / 'state.json'),
+        'watch',
+        '--max-cycles',
+        '1',
+    ]
+
+    assert main.main(argv) == 0
+    (event,) = ndjson.read_events(capsys.readouterr().out.splitlines())
+    assert event.online_locations == [f'{server.url}/event']
+
+    # Nothing changed since the state was saved
+    assert main.main(argv) == 0
+    assert capsys.readouterr().out == ''
+
+
+def _serve_example_sitemap(server):
+    """Serve the example pages with their sitemap, return the CLI option pointing to it."""
+    pages = ['example-event.html', 'example-event-recurring.html', 'example-event-past.html']
+    lastmod = '2024-06-25T10:08:35+00:00'
+    urls = ''.join(
+        f'<url><loc>{server.url}/{page}</loc><lastmod>{lastmod}</lastmod></url>' for page in pages
+    )
+    sitemap = f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    server.add('/sitemap.xml', Reply(body=sitemap.encode()))
+    for page in pages:
+        server.add(f'/{page}', Reply(body=fakes.content_getter(f'testing/{page}')))
+    return ['--sitemap-url', f'{server.url}/sitemap.xml']
+
+
+@freezegun.freeze_time('2024-07-01')
+def test_shards_merged_like_single_process(server, tmp_path, capsys):
+    sitemap_url = _serve_example_sitemap(server)
+
+    assert main.main(sitemap_url) == 0
+    expected = capsys.readouterr().out
+    for index in (1, 2):
+        assert main.main([*sitemap_url, '--shard', f'{index}/2']) == 0
+        (tmp_path / f'shard{index}.ndjson').write_text(capsys.readouterr().out)
+    shards = [str(tmp_path / 'shard2.ndjson'), str(tmp_path / 'shard1.ndjson')]
+
+    assert main.main([*sitemap_url, 'merge', *shards]) == 0
+    assert capsys.readouterr().out == expected
+
+
+@freezegun.freeze_time('2024-07-10')
+def test_future_only_keeps_output(server, capsys):
+    sitemap_url = _serve_example_sitemap(server)
+
+    assert main.main(sitemap_url) == 0
+    expected = capsys.readouterr().out
+    assert main.main([*sitemap_url, '--future-only']) == 0
+    assert capsys.readouterr().out == expected
+    assert len(expected.splitlines()) == 2
+
+
+def test_future_only_rejects_state_file(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main.main(['--future-only', '--state-file', str(tmp_path / 'state.json')])
+    assert '--future-only cannot be used with --state-file' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('option', [['--shard', '1/2'], ['--future-only'], ['--replay', 'archive']])
+def test_watch_rejects_unsupported_options(option, capsys):
+    with pytest.raises(SystemExit):
+        main.main([*option, 'watch'])
+    assert f'{option[0]} cannot be used with watch' in capsys.readouterr().err
+
+
+def test_publish_command_rejects_non_positive_rate(capsys):
+    with pytest.raises(SystemExit):
+        main.main(['publish', '--instance-url', 'https://gancio.example.com', '--rate', '0'])
+    assert 'expected a positive number, got `0`' in capsys.readouterr().err
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from event_scrapper_srt import main
+from event_scrapper_srt import metrics
+from event_scrapper_srt.metrics import Metrics
+from testing import resources
+from testing.server import Reply
+
+
+@pytest.fixture()
+def registry():
+    yield metrics.METRICS
+    metrics.METRICS.enabled = False
+    metrics.METRICS.reset()
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics()
+    registry.inc('pages_total')
+    registry.observe('page_fetch_seconds', 0.2)
+    with registry.timer('run_seconds'):
+        pass
+    assert registry.summary() == {'counters': [], 'gauges': [], 'histograms': []}
+
+
+def test_summary():
+    registry = Metrics()
+    registry.enabled = True
+    registry.inc('http_responses_total', status='200')
+    registry.inc('http_responses_total', status='200')
+    registry.observe('page_fetch_seconds', 0.02)
+    registry.observe('page_fetch_seconds', 0.2)
+
+    summary = registry.summary()
+
+    assert summary['counters'] == [
+        {'name': 'http_responses_total', 'labels': {'status': '200'}, 'value': 2}
+    ]
+    (histogram,) = summary['histograms']
+    assert histogram['count'] == 2
+    assert histogram['mean'] == pytest.approx(0.11)
+    assert histogram['buckets']['0.025'] == 1
+    assert histogram['buckets']['0.25'] == 1
+
+
+def test_write_prometheus(tmp_path):
+    registry = Metrics()
+    registry.enabled = True
+    registry.inc('output_events_total', 3)
+    registry.set('peak_rss_bytes', 2**20)
+    registry.observe('page_parse_seconds', 0.02)
+    registry.write_prometheus(tmp_path / 'srt.prom')
+    lines = (tmp_path / 'srt.prom').read_text().splitlines()
+    assert 'srt_output_events_total 3.0' in lines
+    assert 'srt_peak_rss_bytes 1048576' in lines
+    assert 'srt_page_parse_seconds_bucket{le="0.01"} 0' in lines
+    assert 'srt_page_parse_seconds_bucket{le="0.025"} 1' in lines
+    assert 'srt_page_parse_seconds_bucket{le="+Inf"} 1' in lines
+    assert 'srt_page_parse_seconds_count 1' in lines
+    assert lines.count('# TYPE srt_output_events_total counter') == 1
+    assert '# TYPE srt_peak_rss_bytes gauge' in lines
+    assert '# TYPE srt_page_parse_seconds histogram' in lines
+
+
+def test_write_prometheus_escapes_labels(tmp_path):
+    registry = Metrics()
+    registry.enabled = True
+    registry.inc('page_fetch_errors_total', reason='bad "status"\nline \\ end')
+    registry.inc('page_fetch_errors_total', reason='timeout')
+    registry.write_prometheus(tmp_path / 'srt.prom')
+    lines = (tmp_path / 'srt.prom').read_text().splitlines()
+    assert lines == [
+        '# TYPE srt_page_fetch_errors_total counter',
+        'srt_page_fetch_errors_total{reason="bad \\"status\\"\\nline \\\\ end"} 1.0',
+        'srt_page_fetch_errors_total{reason="timeout"} 1.0',
+    ]
+
+
+def test_main_writes_metrics(registry, server, tmp_path, capsys):  # noqa: ARG001
+    server.add('/api/event', Reply(body=b'{"id": 1}'))
+    main.dump_events_to_json(resources.example_event_recurring_gancio)
+    input_path = tmp_path / 'events.ndjson'
+    input_path.write_text(capsys.readouterr().out)
+    argv = ['--metrics-json', str(tmp_path / 'metrics.json'), 'publish', str(input_path)]
+
+    main.main([*argv, '--instance-url', server.url])
+
+    summary = json.loads((tmp_path / 'metrics.json').read_text())
+    assert {'name': 'http_responses_total', 'labels': {'status': '200'}, 'value': 2} in summary[
+        'counters'
+    ]
+    assert [hist['name'] for hist in summary['histograms']] == ['run_seconds']
+    (peak_rss,) = summary['gauges']
+    assert peak_rss['name'] == 'peak_rss_bytes'
+    assert peak_rss['value'] > 0
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import io
+import json
+from dataclasses import replace
+
+import pytest
+
+from event_scrapper_srt import gancio
+from event_scrapper_srt import ndjson
+from testing import resources
+
+
+def _expected(events):
+    return ''.join(
+        json.dumps(gancio.to_dict(event), indent=None, ensure_ascii=False, default=str) + '\n'
+        for event in events
+    )
+
+
+@pytest.mark.parametrize(
+    'events',
+    [
+        resources.example_event_gancio,
+        resources.example_event_recurring_gancio,
+        [
+            replace(
+                resources.example_event_gancio[0],
+                title='Zażółć "gęślą"\tjaźń\n\\   \x7f 🎷',
+                end_datetime=None,
+                tags=[],
+                image_url=None,
+            )
+        ],
+        [replace(resources.example_event_gancio[0], multidate=0, recurrent={'frequency': '1w'})],
+    ],
+)
+def test_writer_output_identical_to_json_dump(events):
+    stream = io.StringIO()
+    writer = ndjson.NdjsonWriter(stream)
+    for event in events:
+        writer.write(event)
+    writer.flush()
+    assert stream.getvalue() == _expected(events)
+    assert writer.count == len(events)
+
+
+def test_writer_writes_in_chunks():
+    events = resources.example_event_recurring_gancio
+    stream = io.StringIO()
+    writer = ndjson.NdjsonWriter(stream, chunk_size=1)
+    writer.write(events[0])
+    assert stream.getvalue() == _expected(events[:1])
+
+    stream = io.StringIO()
+    writer = ndjson.NdjsonWriter(stream)
+    writer.write(events[0])
+    assert stream.getvalue() == ''
+    writer.flush()
+    assert stream.getvalue() == _expected(events[:1])
+
+
+def test_grouped_output_expands_to_events():
+    events = resources.example_event_gancio + resources.example_event_recurring_gancio
+    stream = io.StringIO()
+    writer = ndjson.NdjsonWriter(stream)
+    writer.write_group(events[:1])
+    writer.write_group(events[1:])
+    writer.flush()
+    lines = stream.getvalue().splitlines(keepends=True)
+    assert len(lines) == 2
+    assert json.loads(lines[1])['occurrences'] == [
+        [event.start_datetime, event.end_datetime] for event in events[1:]
+    ]
+    assert writer.count == len(events)
+    assert list(ndjson.read_events(lines)) == events
+    assert len(stream.getvalue()) < len(_expected(events))
+
+
+def test_grouped_output_keeps_order_around_recurrent_events():
+    single, recurring = resources.example_event_recurring_gancio
+    recurrent = replace(recurring, multidate=0, recurrent={'frequency': '1w'})
+    later = replace(single, start_datetime=single.start_datetime + 86400 * 30)
+    events = [single, recurrent, later]
+    stream = io.StringIO()
+    writer = ndjson.NdjsonWriter(stream)
+    writer.write_group(events)
+    writer.flush()
+    lines = stream.getvalue().splitlines(keepends=True)
+    assert len(lines) == 3
+    assert json.loads(lines[1])['recurrent'] == {'frequency': '1w'}
+    assert list(ndjson.read_events(lines)) == events
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import http.client
+import time
+import urllib.error
+
+import pytest
+
+from event_scrapper_srt import util
+from event_scrapper_srt.client import HttpClient
+from event_scrapper_srt.client import PageTooLargeError
+from event_scrapper_srt.policy import CircuitBreaker
+from event_scrapper_srt.policy import CircuitOpenError
+from event_scrapper_srt.policy import FetchPolicy
+from testing.server import Reply
+
+
+def _no_sleep(_seconds):
+    pass
+
+
+def test_retries_server_error(server):
+    server.add('/page', Reply(status=503), Reply(status=500), Reply(body=b'hello'))
+    policy = FetchPolicy(HttpClient().get_content, retries=2, sleep=_no_sleep)
+    assert policy.get_content(f'{server.url}/page') == b'hello'
+    assert len(server.requests) == 3
+
+
+def test_page_too_large_not_retried(server):
+    server.add('/page', Reply(body=b'x' * 100))
+    policy = FetchPolicy(HttpClient(max_body_size=10).get_content, sleep=_no_sleep)
+    with pytest.raises(PageTooLargeError):
+        policy.get_content(f'{server.url}/page')
+    assert len(server.requests) == 1
+
+
+def test_client_error_not_retried(server):
+    policy = FetchPolicy(HttpClient().get_content, retries=2, sleep=_no_sleep)
+    with pytest.raises(urllib.error.HTTPError):
+        policy.get_content(f'{server.url}/missing')
+    assert len(server.requests) == 1
+
+
+def test_timeout_retried(server):
+    server.add('/page', Reply(body=b'slow', delay=0.5), Reply(body=b'fast'))
+    client = HttpClient(read_timeout=0.1)
+    policy = FetchPolicy(client.get_content, retries=1, sleep=_no_sleep)
+    assert policy.get_content(f'{server.url}/page') == b'fast'
+
+
+def test_failed_page_skipped(server):
+    server.add('/bad', Reply(status=500))
+    server.add('/good', Reply(body=b'good'))
+    policy = FetchPolicy(HttpClient().get_content, retries=1, sleep=_no_sleep)
+    urls = [f'{server.url}/bad', f'{server.url}/good']
+    assert list(util.fetch_all(urls, policy.get_content)) == [(urls[0], None), (urls[1], b'good')]
+    assert len(server.requests) == 3
+
+
+def test_circuit_breaker(server):
+    server.add('/page', Reply(status=500), Reply(status=500), Reply(body=b'back'))
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=10, clock=lambda: now[0])
+    policy = FetchPolicy(HttpClient().get_content, retries=0, breaker=breaker, sleep=_no_sleep)
+    url = f'{server.url}/page'
+    for _ in range(2):
+        with pytest.raises(urllib.error.HTTPError):
+            policy.get_content(url)
+
+    with pytest.raises(CircuitOpenError):
+        policy.get_content(url)
+    assert len(server.requests) == 2
+
+    # Trial request after the circuit was open long enough closes it
+    now[0] = 10
+    assert policy.get_content(url) == b'back'
+    assert policy.get_content(url) == b'back'
+
+
+def test_hedged_request(server):
+    server.add('/page', Reply(body=b'stalled', delay=2), Reply(body=b'hedged'))
+    policy = FetchPolicy(HttpClient().get_content, hedge=True, hedge_after=0.05)
+    start = time.monotonic()
+    assert policy.get_content(f'{server.url}/page') == b'hedged'
+    assert time.monotonic() - start < 1
+    assert len(server.requests) == 2
+
+
+def test_hedge_threshold_from_latencies(server):
+    server.add('/page', Reply(body=b'hello'))
+    policy = FetchPolicy(HttpClient().get_content, hedge=True)
+    for _ in range(20):
+        policy.get_content(f'{server.url}/page')
+    assert policy._hedge_threshold() is not None  # noqa: SLF001
+
+
+def _replies(*outcomes):
+    """Return content getter raising or returning the outcomes in order."""
+    remaining = list(outcomes)
+
+    def get_content(_url):
+        outcome = remaining.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return get_content
+
+
+def test_malformed_response_retried():
+    get_content = _replies(http.client.IncompleteRead(b'hel'), b'hello')
+    policy = FetchPolicy(get_content, retries=1, sleep=_no_sleep)
+    assert policy.get_content('https://example.com/page') == b'hello'
+
+
+def test_unexpected_error_releases_trial_request():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=10, clock=lambda: now[0])
+    get_content = _replies(OSError('down'), ValueError('broken'), b'back')
+    policy = FetchPolicy(get_content, retries=0, breaker=breaker, sleep=_no_sleep)
+    url = 'https://example.com/page'
+    with pytest.raises(OSError, match='down'):
+        policy.get_content(url)
+
+    now[0] = 10
+    with pytest.raises(ValueError, match='broken'):
+        policy.get_content(url)
+    with pytest.raises(CircuitOpenError):
+        policy.get_content(url)
+
+    now[0] = 20
+    assert policy.get_content(url) == b'back'
+
+
+def test_close_stops_hedging_threads(server):
+    server.add('/page', Reply(body=b'hello'))
+    policy = FetchPolicy(HttpClient().get_content, hedge=True, hedge_after=1)
+    assert policy.get_content(f'{server.url}/page') == b'hello'
+    policy.close()
+    with pytest.raises(RuntimeError):
+        policy.get_content(f'{server.url}/page')
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import datetime
+import zoneinfo
+
+import pytest
+
+from event_scrapper_srt.event import Occurrence
+from event_scrapper_srt.recurrence import detect_runs
+from event_scrapper_srt.recurrence import series_key
+
+TZ = zoneinfo.ZoneInfo('Europe/Warsaw')
+
+
+def _occurrence(day, hours=3, hour=20):
+    year, month, day_of_month = day
+    start = datetime.datetime(year, month, day_of_month, hour, tzinfo=TZ)
+    return Occurrence(start=start, end=start + datetime.timedelta(hours=hours))
+
+
+def test_weekly_run_with_irregular_date():
+    weekly = [_occurrence((2024, 7, day)) for day in (7, 14, 21, 28)]
+    extra = _occurrence((2024, 7, 10))
+    runs, irregular = detect_runs([*weekly[:2], extra, *weekly[2:]])
+    assert [(run.frequency, run.occurrences) for run in runs] == [('1w', weekly)]
+    assert runs[0].recurrent() == {'frequency': '1w'}
+    assert irregular == [extra]
+
+
+def test_biweekly_run():
+    biweekly = [_occurrence((2024, 7, 7)), _occurrence((2024, 7, 21)), _occurrence((2024, 8, 4))]
+    runs, irregular = detect_runs(biweekly)
+    assert [(run.frequency, run.occurrences) for run in runs] == [('2w', biweekly)]
+    assert irregular == []
+
+
+def test_monthly_run_on_ordinal_weekday():
+    # Second Sunday of the month
+    monthly = [_occurrence((2024, 7, 14)), _occurrence((2024, 8, 11)), _occurrence((2024, 9, 8))]
+    runs, irregular = detect_runs(monthly)
+    assert [(run.frequency, run.occurrences) for run in runs] == [('1m', monthly)]
+    assert runs[0].recurrent() == {'frequency': '1m', 'type': 2}
+    assert irregular == []
+
+
+def test_weekly_run_across_dst_change():
+    weekly = [_occurrence((2024, 10, day)) for day in (13, 20, 27)]
+    runs, _ = detect_runs(weekly)
+    assert [run.occurrences for run in runs] == [weekly]
+
+
+@pytest.mark.parametrize(
+    'occurrences',
+    [
+        # Too short
+        [_occurrence((2024, 7, 7)), _occurrence((2024, 7, 14))],
+        # Different duration
+        [
+            _occurrence((2024, 7, 7)),
+            _occurrence((2024, 7, 14), hours=2),
+            _occurrence((2024, 7, 21)),
+        ],
+        # Different time
+        [
+            _occurrence((2024, 7, 7)),
+            _occurrence((2024, 7, 14), hour=19),
+            _occurrence((2024, 7, 21)),
+        ],
+    ],
+)
+def test_irregular_dates(occurrences):
+    assert detect_runs(occurrences) == ([], occurrences)
+
+
+def test_run_open_ended_only_if_next_date_after_horizon():
+    weekly = [_occurrence((2024, 7, day)) for day in (7, 14, 21)]
+    (run,), _ = detect_runs(weekly)
+    assert run.open_ended(datetime.datetime(2024, 7, 25, tzinfo=TZ))
+    # The source lists dates until August, but it doesn't list 28 July
+    assert not run.open_ended(datetime.datetime(2024, 8, 4, tzinfo=TZ))
+
+
+def test_series_key_same_for_all_occurrences():
+    monthly = [_occurrence((2024, 7, 14)), _occurrence((2024, 8, 11)), _occurrence((2024, 9, 8))]
+    (run,), _ = detect_runs(monthly)
+    keys = {series_key(dt.start, run.recurrent()) for dt in monthly}
+    assert keys == {'1m/2/7/20:00'}
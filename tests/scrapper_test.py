@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import dataclasses
+import datetime
+import http.client
 import logging
 
 import pytest
 
 from event_scrapper_srt import scrapper
+from event_scrapper_srt.sitemap import SitemapElem
+from event_scrapper_srt.state import StateEntry
 from testing import fakes
 from testing import resources
 
@@ -36,3 +41,210 @@ def test_get_events_past(url, expected, caplog):
     assert actual[0] == expected[0]
     assert len(actual) == len(expected) == 1
     assert '[Swingowa potańcówka nad Motławą] No date and time information found' in caplog.text
+
+
+def test_get_events_concurrent_keeps_order():
+    urls = [
+        'testing/example-event-recurring.html',
+        'testing/example-event.html',
+        'testing/example-event-past.html',
+    ]
+    actual = scrapper.get_events(urls, content_getter=fakes.content_getter, concurrency=3)
+    assert actual == [
+        resources.example_event_recurring,
+        resources.example_event,
+        resources.example_event_past,
+    ]
+
+
+def test_get_events_skips_failing_page(caplog):
+    urls = ['testing/example-event.html', 'testing/missing.html']
+    actual = scrapper.get_events(urls, content_getter=fakes.content_getter, concurrency=2)
+    assert actual == [resources.example_event]
+    assert 'Failed to fetch `testing/missing.html`' in caplog.text
+
+
+def test_get_events_skips_page_with_malformed_response(caplog):
+    def content_getter(url):
+        if url == 'testing/broken.html':
+            raise http.client.BadStatusLine('garbage')
+        return fakes.content_getter(url)
+
+    urls = ['testing/example-event.html', 'testing/broken.html']
+    actual = scrapper.get_events(urls, content_getter=content_getter, concurrency=2)
+    assert actual == [resources.example_event]
+    assert 'Failed to fetch `testing/broken.html`' in caplog.text
+
+
+def test_get_events_incremental():
+    elements = [
+        SitemapElem(url='testing/example-event.html', lastmod='2024-06-25T10:00:00+00:00'),
+        SitemapElem(
+            url='testing/example-event-recurring.html', lastmod='2024-06-26T10:00:00+00:00'
+        ),
+    ]
+    stale_event = dataclasses.replace(resources.example_event_recurring, title='Old title')
+    previous_state = {
+        'testing/example-event.html': StateEntry(
+            lastmod='2024-06-25T10:00:00+00:00',
+            event=dataclasses.replace(resources.example_event, title='Cached title'),
+        ),
+        'testing/example-event-recurring.html': StateEntry(
+            lastmod='2024-06-20T10:00:00+00:00', event=stale_event
+        ),
+        'testing/removed.html': StateEntry(lastmod='2024-06-20T10:00:00+00:00', event=stale_event),
+    }
+    fetched = []
+
+    def content_getter(url):
+        fetched.append(url)
+        return fakes.content_getter(url)
+
+    events, new_state = scrapper.get_events_incremental(
+        elements, previous_state, content_getter=content_getter
+    )
+
+    assert fetched == ['testing/example-event-recurring.html']
+    assert [event.title for event in events] == [
+        'Cached title',
+        resources.example_event_recurring.title,
+    ]
+    assert list(new_state) == [elem.url for elem in elements]
+    assert new_state['testing/example-event-recurring.html'].lastmod == elements[1].lastmod
+
+
+@pytest.mark.parametrize(
+    ('url', 'expected'),
+    [
+        ('testing/example-event.html', resources.example_event),
+        ('testing/example-event-recurring.html', resources.example_event_recurring),
+        ('testing/example-event-past.html', resources.example_event_past),
+    ],
+)
+@pytest.mark.parametrize('engine', ['bs4', 'lxml'])
+def test_get_events_engine(url, expected, engine):
+    actual = scrapper.get_events([url], content_getter=fakes.content_getter, engine=engine)
+    assert actual == [expected]
+
+
+_PAGE = """<html><body>
+<header><div data-bg="url(https://example.com/image.jpg)"></div></header>
+{title}
+<div>{header}{description}</div>
+<div><h5>Kiedy?</h5><div><p><strong>27 lipca 2024</strong> 12:00 - 15:00</p></div></div>
+{place}
+</body></html>"""
+
+
+@pytest.mark.parametrize(
+    'parts',
+    [
+        {'description': '<p>Plain <b>bold</b> &amp; <br>text</p>'},
+        {'description': '<p>Intro<ul><li>one</li></ul> tail</p>'},
+        {'description': '<p>x<div>y</div>z</p>'},
+        {'description': '<p>\n<p>a</p><ul><li>b</li></ul>\n</p><p>after</p>'},
+        {'description': '<p>Unclosed<ul><li>one</li></ul>'},
+        {'description': '<p>\n<p>a</p> between <p>b <i>c</i></p>\n</p>'},
+        {'description': '<p>\n<p>a<ul><li>b</li></ul></p>\n</p>'},
+        {'header': '<h4>Trochę <b>szczegółów</b></h4>', 'description': '<p>x<div>y</div>z</p>'},
+        {'title': '<h1> </h1><h1>Second</h1>'},
+        {
+            'place': '<div><h5>Gdzie?</h5></div>'
+            '<div><h5>Gdzie?</h5><p>Studio, Łąkowa 35/38, Gdańsk</p></div>'
+        },
+    ],
+)
+def test_engines_agree_on_edge_cases(parts):
+    parts = {
+        'title': '<h1>Title</h1>',
+        'header': '<h4>Trochę szczegółów</h4>',
+        'description': '<p>Description</p>',
+        'place': '<div><h5>Gdzie?</h5><p>Studio, Łąkowa 35/38, Gdańsk</p></div>',
+        **parts,
+    }
+    content = _PAGE.format(**parts).encode()
+    expected = scrapper.ENGINES['bs4'](content, 'url', None)
+    assert scrapper.ENGINES['lxml'](content, 'url', None) == expected
+
+
+@pytest.mark.parametrize(
+    ('after', 'expected'),
+    [
+        (
+            datetime.datetime(2024, 7, 10, tzinfo=datetime.timezone.utc),
+            [resources.example_event_recurring, resources.example_event],
+        ),
+        (datetime.datetime(2024, 7, 15, tzinfo=datetime.timezone.utc), [resources.example_event]),
+    ],
+)
+@pytest.mark.parametrize('engine', ['bs4', 'lxml'])
+def test_get_events_after_skips_past_pages(after, expected, engine, caplog):
+    caplog.set_level(logging.INFO)
+    urls = [
+        'testing/example-event-recurring.html',
+        'testing/example-event.html',
+        'testing/example-event-past.html',
+    ]
+    actual = scrapper.get_events(
+        urls, content_getter=fakes.content_getter, engine=engine, after=after
+    )
+    assert actual == expected
+    assert f'Skipped {3 - len(expected)} pages with no future occurrences' in caplog.text
+
+
+@pytest.mark.parametrize('engine', ['bs4', 'lxml'])
+def test_after_skips_past_page_without_parsing_it(engine, monkeypatch):
+    def fail(*_args):
+        pytest.fail('The whole page was parsed')
+
+    monkeypatch.setattr(scrapper, '_get_date_times', fail)
+    monkeypatch.setattr(scrapper, '_parse_lxml', fail)
+    content = fakes.content_getter('testing/example-event-recurring.html')
+    after = datetime.datetime(2024, 7, 15, tzinfo=datetime.timezone.utc)
+    assert scrapper.ENGINES[engine](content, 'testing/example-event-recurring.html', after) is None
+
+
+def test_get_events_parse_workers_keeps_order():
+    urls = [
+        'testing/example-event-recurring.html',
+        'testing/missing.html',
+        'testing/example-event.html',
+        'testing/example-event-past.html',
+    ]
+    actual = scrapper.get_events(
+        urls, content_getter=fakes.content_getter, concurrency=2, parse_workers=2
+    )
+    assert actual == [
+        resources.example_event_recurring,
+        resources.example_event,
+        resources.example_event_past,
+    ]
+
+
+def test_extract_in_pool_limits_queued_pages():
+    content = fakes.content_getter('testing/example-event.html')
+    read = []
+
+    def pages():
+        for index in range(20):
+            read.append(index)
+            yield f'page{index}', content
+
+    events = scrapper._extract_in_pool(pages(), 'lxml', None, workers=2)  # noqa: SLF001
+    for count, _ in enumerate(events, start=1):
+        # Pages are read only as fast as they are parsed
+        assert len(read) - count < 4
+    assert len(read) == 20
+
+
+@pytest.mark.parametrize('engine', ['bs4', 'lxml'])
+def test_get_events_no_end_time(tmp_path, engine, caplog):
+    html = fakes.content_getter('testing/example-event-recurring.html').decode()
+    path = tmp_path / 'event.html'
+    path.write_text(html.replace('20:00 - 23:00', '20:00'))
+    actual = scrapper.get_events([str(path)], content_getter=fakes.content_getter, engine=engine)
+    assert [dt.start for dt in actual[0].date_times] == [
+        dt.start for dt in resources.example_event_recurring.date_times
+    ]
+    assert [dt.end for dt in actual[0].date_times] == [None, None]
+    assert 'No end time found for the date `<p><strong>7 lipca 2024</strong> 20:00' in caplog.text
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from event_scrapper_srt import shard
+
+
+@pytest.mark.parametrize(('value', 'expected'), [('1/1', (1, 1)), ('2/3', (2, 3))])
+def test_parse_shard(value, expected):
+    assert shard.parse_shard(value) == expected
+
+
+@pytest.mark.parametrize('value', ['', '1', '0/2', '3/2', 'a/2', '1/-2'])
+def test_parse_shard_invalid(value):
+    with pytest.raises(ValueError, match='expected'):
+        shard.parse_shard(value)
+
+
+def test_shards_are_disjoint_and_complete():
+    urls = [f'https://example.com/event-{i}/' for i in range(100)]
+    shards = [[url for url in urls if shard.in_shard(url, index, 3)] for index in (1, 2, 3)]
+    assert sorted(url for urls_in_shard in shards for url in urls_in_shard) == sorted(urls)
+    assert all(urls_in_shard for urls_in_shard in shards)
+
+
+def _line(url, start):
+    return json.dumps({'online_locations': [url], 'start_datetime': start}) + '\n'
+
+
+def test_merge_in_sitemap_order():
+    first = [_line('https://example.com/b', 1), _line('https://example.com/b', 2)]
+    second = [_line('https://example.com/c', 3), _line('https://example.com/a', 4).rstrip('\n')]
+    urls = ['https://example.com/a', 'https://example.com/b']
+
+    assert list(shard.merge([first, second], urls)) == [
+        _line('https://example.com/a', 4),
+        *first,
+        # Not in the sitemap anymore
+        _line('https://example.com/c', 3),
+    ]
@@ -1,10 +1,32 @@
 from __future__ import annotations
 
+import datetime
+
 import freezegun
+import pytest
 
+from event_scrapper_srt import metrics
 from event_scrapper_srt import sitemap
+from event_scrapper_srt import util
 from testing import fakes
 
+_INDEX = (
+    b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    b'<sitemap><loc>testing/example-sitemap-index.xml</loc></sitemap>'
+    b'<sitemap><loc>extra.xml</loc></sitemap>'
+    b'</sitemapindex>'
+)
+_EXTRA = (
+    b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    b'<url><loc>https://swingrevolution.pl/wydarzenia/extra/</loc>'
+    b'<lastmod>2024-07-09T12:00:00+00:00</lastmod></url>'
+    b'</urlset>'
+)
+
+
+def _nested_content_getter(url):
+    return {'index.xml': _INDEX, 'extra.xml': _EXTRA}.get(url) or fakes.content_getter(url)
+
 
 @freezegun.freeze_time('2023-02-28')
 def test_get_urls():
@@ -17,3 +39,107 @@ def test_get_urls():
         'https://swingrevolution.pl/wydarzenia/w-rytmie-swinga-potancowka/',
     ]
     assert actual == expected
+
+
+@freezegun.freeze_time('2024-07-10')
+def test_get_urls_sitemap_index():
+    fetched = []
+
+    def content_getter(url):
+        fetched.append(url)
+        return fakes.content_getter(url)
+
+    actual = sitemap.get_urls('testing/example-sitemap-index.xml', content_getter=content_getter)
+    expected = [
+        'https://swingrevolution.pl/wydarzenia/warsztaty-lindy-hop-od-podstaw/',
+        'https://swingrevolution.pl/wydarzenia/sunday-summer-night-coniedzielna-potancowka/',
+        'https://swingrevolution.pl/wydarzenia/practice-chill/',
+    ]
+    assert actual == expected
+    # Child sitemap older than `max_age_days` is not fetched
+    assert 'testing/example-events-sitemap-old.xml' not in fetched
+
+
+@freezegun.freeze_time('2024-07-10')
+def test_get_urls_nested_sitemap_index_without_lastmod():
+    pages = {
+        'index.xml': (
+            b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            b'<sitemap><loc>testing/example-sitemap-index.xml</loc></sitemap>'
+            b'<sitemap><loc>index.xml</loc></sitemap>'
+            b'</sitemapindex>'
+        )
+    }
+    fetched = []
+
+    def content_getter(url):
+        fetched.append(url)
+        return pages[url] if url in pages else fakes.content_getter(url)
+
+    actual = sitemap.get_urls('index.xml', content_getter=content_getter)
+    assert actual == [
+        'https://swingrevolution.pl/wydarzenia/warsztaty-lindy-hop-od-podstaw/',
+        'https://swingrevolution.pl/wydarzenia/sunday-summer-night-coniedzielna-potancowka/',
+        'https://swingrevolution.pl/wydarzenia/practice-chill/',
+    ]
+    # The index referencing itself is fetched only once
+    assert fetched.count('index.xml') == 1
+
+
+@freezegun.freeze_time('2024-07-10')
+def test_get_urls_nested_sitemap_index_keeps_index_order():
+    actual = sitemap.get_urls('index.xml', content_getter=_nested_content_getter)
+    # Newest first, as if the nested index was replaced with its child sitemaps
+    assert actual == [
+        'https://swingrevolution.pl/wydarzenia/extra/',
+        'https://swingrevolution.pl/wydarzenia/warsztaty-lindy-hop-od-podstaw/',
+        'https://swingrevolution.pl/wydarzenia/sunday-summer-night-coniedzielna-potancowka/',
+        'https://swingrevolution.pl/wydarzenia/practice-chill/',
+    ]
+
+
+@freezegun.freeze_time('2024-07-10')
+def test_fetch_elements_sitemap_index_concurrency(monkeypatch):
+    concurrencies = []
+    fetch_all = util.fetch_all
+
+    def fake_fetch_all(urls, content_getter, *, concurrency, metric):
+        concurrencies.append(concurrency)
+        return fetch_all(urls, content_getter, concurrency=concurrency, metric=metric)
+
+    monkeypatch.setattr(util, 'fetch_all', fake_fetch_all)
+    sitemap.fetch_elements('index.xml', _nested_content_getter, concurrency=3)
+    assert concurrencies == [3, 3]
+
+
+@pytest.fixture()
+def registry():
+    metrics.METRICS.enabled = True
+    yield metrics.METRICS
+    metrics.METRICS.enabled = False
+    metrics.METRICS.reset()
+
+
+@freezegun.freeze_time('2024-07-10')
+def test_fetch_elements_sitemap_index_metrics(registry):
+    sitemap.fetch_elements('index.xml', _nested_content_getter)
+    summary = registry.summary()
+    counters = {counter['name'] for counter in summary['counters']}
+    histograms = {histogram['name']: histogram['count'] for histogram in summary['histograms']}
+    assert 'sitemap_fetch_bytes_total' in counters
+    assert 'page_fetch_bytes_total' not in counters
+    # Both indexes and three child sitemaps, the old one is skipped
+    assert histograms['sitemap_fetch_seconds'] == 5
+    assert 'page_fetch_seconds' not in histograms
+
+
+def test_iter_elements_keeps_document_order():
+    content = fakes.content_getter('testing/example-events-sitemap.xml')
+    now = datetime.datetime(2023, 2, 1, tzinfo=datetime.timezone.utc)
+    actual = list(sitemap.iter_elements(content, max_age_days=30, now=now))
+    assert [elem.url for elem in actual] == [
+        'https://swingrevolution.pl/wydarzenia/swingowa-potancowka-nad-motlawa/',
+        'https://swingrevolution.pl/wydarzenia/w-rytmie-swinga-potancowka/',
+        'https://swingrevolution.pl/wydarzenia/practice-chill/',
+        'https://swingrevolution.pl/wydarzenia/sunday-summer-night-coniedzielna-potancowka/',
+    ]
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks import startup
+from event_scrapper_srt import main
+from event_scrapper_srt import scrapper
+
+
+def test_heavy_modules_not_imported_at_startup():
+    # A fresh interpreter, as the tests themselves import the heavy modules
+    code = (
+        'import sys, event_scrapper_srt.main; '
+        f'print(*[name for name in {startup.HEAVY_MODULES!r} if name in sys.modules])'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[1],
+    )
+    assert result.stdout.split() == []
+
+
+def test_engine_choices():
+    assert tuple(sorted(scrapper.ENGINES)) == main.ENGINES
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import pytest
+
+from event_scrapper_srt import state
+from event_scrapper_srt.state import StateEntry
+from testing import resources
+
+
+@pytest.mark.parametrize(
+    'event',
+    [
+        resources.example_event,
+        resources.example_event_recurring,
+        resources.example_event_past,
+    ],
+)
+def test_save_load_state(tmp_path, event):
+    expected = {event.url: StateEntry(lastmod='2024-06-25T10:08:35+00:00', event=event)}
+    state.save_state(tmp_path / 'state.json', expected)
+    actual = state.load_state(tmp_path / 'state.json')
+    assert actual == expected
+    assert actual[event.url].event.date_times == event.date_times
+
+
+def test_load_state_missing_file(tmp_path):
+    assert state.load_state(tmp_path / 'state.json') == {}
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import replace
+
+from event_scrapper_srt.store import EventStore
+from testing import resources
+
+
+def test_store_and_query(tmp_path):
+    recurring = resources.example_event_recurring_gancio
+    with EventStore(tmp_path / 'events.db') as store:
+        store.add(resources.example_event, resources.example_event_gancio)
+        store.add(resources.example_event_recurring, recurring)
+        expected = sorted(
+            resources.example_event_gancio + recurring, key=lambda event: event.start_datetime
+        )
+        assert store.query() == expected
+        assert store.query(start_from=recurring[1].start_datetime) == [
+            event for event in expected if event.start_datetime >= recurring[1].start_datetime
+        ]
+        assert store.query(start_to=recurring[1].start_datetime) == [
+            event for event in expected if event.start_datetime < recurring[1].start_datetime
+        ]
+        assert store.query(place_name=recurring[0].place_name) == [
+            event for event in expected if event.place_name == recurring[0].place_name
+        ]
+
+
+def test_store_keeps_recurrence(tmp_path):
+    recurrent = [
+        replace(resources.example_event_gancio[0], multidate=0, recurrent={'frequency': '1w'})
+    ]
+    with EventStore(tmp_path / 'events.db') as store:
+        store.add(resources.example_event, recurrent)
+        assert store.query() == recurrent
+
+
+def test_store_adds_columns_to_old_database(tmp_path):
+    path = tmp_path / 'events.db'
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE gancio_events (url TEXT NOT NULL, start_datetime INTEGER NOT NULL, '
+            'end_datetime INTEGER, title TEXT NOT NULL, description TEXT NOT NULL, '
+            'place_name TEXT NOT NULL, place_address TEXT NOT NULL, '
+            'online_locations TEXT NOT NULL, multidate INTEGER NOT NULL, tags TEXT NOT NULL, '
+            'image_url TEXT, PRIMARY KEY (url, start_datetime))'
+        )
+    connection.close()
+    with EventStore(path) as store:
+        store.add(resources.example_event, resources.example_event_gancio)
+        assert store.query() == resources.example_event_gancio
+
+
+def test_store_updates_rows_in_place(tmp_path):
+    path = tmp_path / 'events.db'
+    event = resources.example_event_recurring
+    gancio_events = resources.example_event_recurring_gancio
+    with EventStore(path) as store:
+        store.add(event, gancio_events)
+
+    # Second occurrence is removed from the page, and the title changes
+    changed = replace(event, title='New title', date_times=event.date_times[:1])
+    changed_gancio = [replace(gancio_events[0], title='New title')]
+    with EventStore(path, batch_size=1) as store:
+        store.add(changed, changed_gancio)
+        assert store.query() == changed_gancio
+
+    with sqlite3.connect(path) as connection:
+        assert connection.execute('SELECT count(*), min(title) FROM events').fetchone() == (
+            1,
+            'New title',
+        )
+        assert connection.execute('SELECT count(*) FROM occurrences').fetchone() == (1,)
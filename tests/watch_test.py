@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import freezegun
+import pytest
+
+from event_scrapper_srt import watch
+from testing import fakes
+from testing import resources
+
+SITEMAP_URL = 'https://example.com/sitemap.xml'
+
+
+def _sitemap(*entries):
+    urls = ''.join(
+        f'<url><loc>{url}</loc><lastmod>{lastmod}</lastmod></url>' for url, lastmod in entries
+    )
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode()
+
+
+def test_adaptive_interval():
+    interval = watch.AdaptiveInterval(10, 40)
+    assert [interval.update(changed=changed) for changed in (False, False, False, True, True)] == [
+        20,
+        40,
+        40,
+        20,
+        10,
+    ]
+
+
+def test_adaptive_interval_rejects_invalid_bounds():
+    with pytest.raises(ValueError, match='expected 0 < minimum <= maximum'):
+        watch.AdaptiveInterval(10, 5)
+
+
+@freezegun.freeze_time('2024-07-01')
+def test_watch_emits_only_changes():
+    event = ('testing/example-event.html', '2024-06-25T10:00:00+00:00')
+    recurring = ('testing/example-event-recurring.html', '2024-06-25T10:00:00+00:00')
+    pages = {SITEMAP_URL: _sitemap(event)}
+    fetched = []
+
+    def content_getter(url):
+        fetched.append(url)
+        return pages[url] if url in pages else fakes.content_getter(url)
+
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            pages[SITEMAP_URL] = _sitemap(recurring, event)
+
+    cycles = list(
+        watch.watch(
+            SITEMAP_URL,
+            {},
+            watch.AdaptiveInterval(10, 40),
+            content_getter=content_getter,
+            sleep=sleep,
+            max_cycles=3,
+        )
+    )
+
+    assert [cycle.updates for cycle in cycles] == [
+        [(resources.example_event, resources.example_event_gancio)],
+        [],
+        [(resources.example_event_recurring, resources.example_event_recurring_gancio)],
+    ]
+    assert sleeps == [10, 20]
+    assert fetched.count('testing/example-event.html') == 1
+    assert set(cycles[-1].state) == {event[0], recurring[0]}
+
+
+@freezegun.freeze_time('2024-07-01')
+def test_watch_survives_sitemap_error():
+    def content_getter(_url):
+        raise OSError('unreachable')
+
+    cycles = list(
+        watch.watch(
+            SITEMAP_URL,
+            {},
+            watch.AdaptiveInterval(10, 40),
+            content_getter=content_getter,
+            sleep=lambda _: None,
+            max_cycles=2,
+        )
+    )
+    assert [cycle.updates for cycle in cycles] == [[], []]
+
+
+@freezegun.freeze_time('2024-07-01')
+def test_watch_survives_malformed_sitemap():
+    event = ('testing/example-event.html', '2024-06-25T10:00:00+00:00')
+    pages = {SITEMAP_URL: _sitemap(event)[:50]}
+
+    def content_getter(url):
+        return pages[url] if url in pages else fakes.content_getter(url)
+
+    def sleep(_seconds):
+        pages[SITEMAP_URL] = _sitemap(event)
+
+    cycles = list(
+        watch.watch(
+            SITEMAP_URL,
+            {},
+            watch.AdaptiveInterval(10, 40),
+            content_getter=content_getter,
+            sleep=sleep,
+            max_cycles=2,
+        )
+    )
+    assert [cycle.updates for cycle in cycles] == [
+        [],
+        [(resources.example_event, resources.example_event_gancio)],
+    ]